@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Rebuild routes_cache.json from the OSRM API
+Run this after changing node coordinates or adding road routes
+"""
+
+import json
+
+from ikea_supply_chain_simulation import ROUTES_CACHE_FILE, fetch_road_routes
+
+if __name__ == "__main__":
+    road_routes = fetch_road_routes()
+    failed = [route_id for route_id, coords in road_routes.items() if not coords]
+    if failed:
+        print(f"OSRM failed for {', '.join(failed)}, '{ROUTES_CACHE_FILE}' not written")
+    else:
+        with open(ROUTES_CACHE_FILE, 'w') as f:
+            json.dump(road_routes, f)
+        print(f"Road routes saved as '{ROUTES_CACHE_FILE}'")
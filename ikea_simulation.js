@@ -2,84 +2,149 @@
     // IKEA Supply Chain Simulation JavaScript
 
     // RELIABLE MAP REFERENCE
-    const mapId = 'map_cf81f32988bd51799cd74fa41620ae8d';
+    const mapId = 'ikea_map';
     let theMap = window[mapId];
     if (!theMap) {
         console.warn("Map not immediately available, will check later. Map ID:", mapId);
     }
 
+    // Per-vehicle logging fires on every departure and arrival; flip on when debugging
+    const DEBUG = false;
+
     var ikeaSimulation = {
         isPlaying: false,
         simulationSpeed: 1,
         currentScenario: 'baseline',
-        startDate: new Date('2024-01-01T00:00:00'),
-        currentDate: new Date('2024-01-01T00:00:00'),
+        startMs: Date.parse('2024-01-01T00:00:00'),
+        // Calendar fields are only recomputed when the simulated clock crosses midnight
+        currentMonth: 1,
+        currentDateStr: '',
+        MONTH_NAMES: ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
+        dayStartMs: 0,
+        nextDayMs: 0,
         simulationTime: 0,
-        nodeState: {},
-        routesData: {},
-        nodesData: {},
-        routeCoordinates: {},
-        movingMarkers: {},
-        co2Data: {
-            baseline: { truck: 0, rail: 0, air: 0 },
-            green_rail: { truck: 0, rail: 0, air: 0 },
-            local_source: { truck: 0, rail: 0, air: 0 }
-        },
-        scenarioComparison: {
-            baseline: [],
-            green_rail: [],
-            local_source: []
+        nodeState: {"N1_SWE":{"stock":5000,"capacity":10000,"inbound_rate":0,"outbound_rate":0,"production_rate":0,"sales_rate":0},"N2_ROM":{"stock":4000,"capacity":8000,"inbound_rate":0,"outbound_rate":0,"production_rate":0,"sales_rate":0},"N3_DE":{"stock":2500,"capacity":5000,"inbound_rate":0,"outbound_rate":0,"production_rate":0,"sales_rate":0},"N4_CN":{"stock":6000,"capacity":12000,"inbound_rate":0,"outbound_rate":0,"production_rate":0,"sales_rate":0},"N5_FAC":{"stock":2000,"capacity":15000,"inbound_rate":0,"outbound_rate":0,"production_rate":50,"sales_rate":0},"N6_DC":{"stock":5000,"capacity":20000,"inbound_rate":0,"outbound_rate":0,"production_rate":0,"sales_rate":0},"N7_UK":{"stock":500,"capacity":3000,"inbound_rate":0,"outbound_rate":0,"production_rate":0,"sales_rate":20},"N8_US":{"stock":500,"capacity":3000,"inbound_rate":0,"outbound_rate":0,"production_rate":0,"sales_rate":20},"N9_FR":{"stock":500,"capacity":3000,"inbound_rate":0,"outbound_rate":0,"production_rate":0,"sales_rate":20},"N10_IT":{"stock":500,"capacity":3000,"inbound_rate":0,"outbound_rate":0,"production_rate":0,"sales_rate":20}},
+        routesData: {"china_poland":{"from":"N4_CN","to":"N5_FAC","mode":"rail","waypoints":[[22.54,114.05],[34.34,108.93],[43.82,87.61],[43.22,76.85],[55.76,37.62],[53.9,27.56],[52.24,15.91]],"vehicle":"train","capacity":26650,"speed":45,"emission":0.022,"frequency":7,"distance_km":8962.687590484222,"segment_km":[1403.749,2111.661,869.535,3102.824,675.994,798.925],"duration_s":717015.0072387378,"co2_per_trip_kg":5254823.734300899,"direct_km":8574.952330343935},"sweden_poland":{"from":"N1_SWE","to":"N5_FAC","mode":"multimodal","vehicle":"truck","capacity":600,"speed":80,"emission":0.057,"frequency":2,"distance_km":1267.981711945286,"segment_km":[6.542,5.866,9.027,20.281,38.842,22.977,21.199,15.978,12.765,23.667,10.372,30.239,12.176,20.497,13.811,8.628,17.054,16.84,21.915,12.165,15.904,34.553,11.243,27.813,11.209,18.026,15.489,33.078,18.155,9.859,29.647,14.486,28.693,12.195,16.504,19.83,13.749,20.03,12.366,13.521,6.605,13.903,11.46,9.37,15.729,29.227,33.142,15.647,27.775,33.262,8.774,29.656,16.514,38.338,31.972,8.945,12.571,16.489,46.882,20.998,32.456,22.629,10.8],"duration_s":57059.17703753787,"co2_per_trip_kg":43364.97454852878,"direct_km":619.214138203095},"romania_poland":{"from":"N2_ROM","to":"N5_FAC","mode":"truck","vehicle":"truck","capacity":600,"speed":80,"emission":0.057,"frequency":3,"distance_km":1453.0122502301442,"segment_km":[12.855,7.749,11.552,5.548,21.674,48.813,12.228,13.984,18.43,20.624,24.661,22.865,18.552,20.047,15.314,44.302,33.637,27.966,22.659,63.435,16.87,37.745,35.732,31.441,32.255,17.344,24.755,12.097,14.589,30.567,48.732,19.363,12.589,22.785,21.572,24.901,59.972,23.948,31.545,12.006,26.88,11.034,9.383,10.77,8.622,11.697,27.444,18.918,9.287,10.277,11.872,14.571,13.486,14.852,25.511,9.67,12.01,12.599,30.017,18.977,14.414,12.097,9.63],"duration_s":65385.551260356486,"co2_per_trip_kg":49693.01895787093,"direct_km":1017.0248711592882},"germany_poland":{"from":"N3_DE","to":"N5_FAC","mode":"truck","vehicle":"truck","capacity":600,"speed":80,"emission":0.057,"frequency":4,"distance_km":791.3148234611328,"segment_km":[3.932,4.354,35.105,21.098,12.041,10.558,11.6,6.29,9.603,10.512,15.275,5.757,6.714,4.152,9.449,3.113,7.523,3.01,14.437,10.07,3.902,8.371,12.09,5.402,8.779,5.271,7.594,19.881,4.3,6.789,8.152,11.552,15.824,14.713,5.069,12.006,6.824,8.487,6.38,10.801,6.897,15.557,22.869,11.734,18.021,30.892,8.771,14.078,10.278,18.206,22.45,13.134,18.725,12.457,11.457,15.461,37.554,14.892,15.286,17.868,22.629,7.064,4.02],"duration_s":35609.16705575098,"co2_per_trip_kg":27062.966962370745,"direct_km":607.0870079531111},"poland_germany":{"from":"N5_FAC","to":"N6_DC","mode":"truck","vehicle":"truck","capacity":600,"speed":80,"emission":0.057,"frequency":1,"distance_km":656.3026373030037,"segment_km":[0.959,7.866,2.447,15.152,8.44,10.035,15.453,7.006,7.538,13.572,14.512,24.87,8.018,7.584,9.158,7.508,4.998,13.958,10.941,20.517,4.34,9.117,14.043,3.267,10.973,7.035,3.687,16.374,20.028,5.764,12.657,6.009,25.715,3.038,4.477,31.479,10.378,9.657,11.386,6.073,13.759,17.814,1.91,17.639,8.13,17.346,12.615,6.252,6.678,6.398,8.513,8.396,4.522,7.566,10.92,5.413,18.031,2.924,7.09,15.039,15.233,5.246,4.771],"duration_s":29533.618678635168,"co2_per_trip_kg":22445.55019576273,"direct_km":585.3942177924383},"germany_uk":{"from":"N6_DC","to":"N7_UK","mode":"truck","vehicle":"truck","capacity":600,"speed":80,"emission":0.057,"frequency":2,"distance_km":624.3194541283744,"segment_km":[7.503,11.503,6.74,15.144,4.944,4.964,16.271,3.071,9.434,7.251,5.463,12.178,5.119,17.239,9.278,8.601,16.138,9.275,15.502,15.4,16.286,2.788,6.144,21.345,7.298,17.777,22.036,19.891,20.81,11.065,8.369,10.725,3.365,10.292,10.361,3.953,18.829,5.363,0.458,7.668,24.992,8.958,12.116,1.239,4.364,9.267,13.971,7.837,14.825,12.079,3.178,11.787,2.305,4.747,2.93,7.371,5.474,7.685,1.931,12.18,3.861,1.387,1.154],"duration_s":28094.37543577685,"co2_per_trip_kg":21351.725331190406,"direct_km":534.4916554388515},"germany_france":{"from":"N6_DC","to":"N9_FR","mode":"truck","vehicle":"truck","capacity":600,"speed":80,"emission":0.057,"frequency":2,"distance_km":548.6927353185546,"segment_km":[13.396,6.346,7.07,2.379,13.06,3.958,1.125,4.14,3.213,3.049,6.745,9.971,11.2,6.758,5.886,9.366,10.808,4.8,18.988,3.716,6.319,12.415,17.327,6.91,4.405,9.652,7.681,7.979,16.459,21.763,11.485,12.987,2.786,8.427,9.122,9.52,4.231,5.457,1.592,16.395,4.384,10.017,13.689,7.391,10.89,3.502,13.048,13.132,7.12,8.103,10.579,9.407,12.074,17.899,9.141,10.037,2.952,11.371,7.823,4.023,8.103,0.837,2.708],"duration_s":24691.173089334956,"co2_per_trip_kg":18765.29154789457,"direct_km":451.54282480392465},"germany_italy":{"from":"N6_DC","to":"N10_IT","mode":"truck","vehicle":"truck","capacity":600,"speed":80,"emission":0.057,"frequency":3,"distance_km":889.0770713382228,"segment_km":[13.7,9.036,12.946,6.7,10.364,17.172,14.87,7.792,12.937,18.534,15.143,8.712,14.55,14.197,18.83,7.089,17.234,8.91,9.562,15.615,10.42,26.041,11.688,13.313,12.069,17.782,16.633,48.131,9.166,17.003,14.703,21.402,15.983,9.641,13.232,15.228,14.461,14.907,4.507,17.342,10.865,17.8,2.26,8.539,9.593,10.496,9.718,6.166,12.97,14.71,15.685,6.288,16.135,13.069,5.291,10.777,4.916,8.585,7.111,12.349,3.545,28.41,15.119],"duration_s":40008.46821022003,"co2_per_trip_kg":30406.435839767222,"direct_km":676.0343086429058},"germany_usa":{"from":"N6_DC","to":"N8_US","mode":"air","vehicle":"plane","capacity":2550,"speed":900,"emission":0.5,"frequency":7,"distance_km":6064.709820477238,"segment_km":[6064.71],"duration_s":24258.839281908953,"co2_per_trip_kg":7732505.021108479,"direct_km":6064.709820477238}},
+        nodesData: {"N1_SWE":{"name":"Sm\u00e5land Forests, Sweden","coords":[57.75,14.5],"type":"raw_materials","icon":"tree","product":"Pine Timber","capacity":10000,"initial_stock":5000},"N2_ROM":{"name":"Brasov, Romania","coords":[45.65,25.6],"type":"raw_materials","icon":"tree","product":"Pine Timber","capacity":8000,"initial_stock":4000},"N3_DE":{"name":"BASF Ludwigshafen, Germany","coords":[49.48,8.44],"type":"raw_materials","icon":"flask","product":"Glue/Resin","capacity":5000,"initial_stock":2500},"N4_CN":{"name":"Shenzhen Supplier, China","coords":[22.54,114.05],"type":"raw_materials","icon":"cogs","product":"Metal Fittings","capacity":12000,"initial_stock":6000},"N5_FAC":{"name":"IKEA Industry Zb\u0105szynek, Poland","coords":[52.24,15.91],"type":"manufacturing","icon":"industry","product":"Billy Bookshelf Assembly","capacity":15000,"initial_stock":2000},"N6_DC":{"name":"IKEA DC Dortmund, Germany","coords":[51.51,7.46],"type":"distribution","icon":"warehouse","product":"Distribution Hub","capacity":20000,"initial_stock":5000},"N7_UK":{"name":"IKEA Wembley, UK","coords":[51.55,-0.27],"type":"retail","icon":"shopping-cart","product":"Retail Store","capacity":3000,"initial_stock":500},"N8_US":{"name":"IKEA Brooklyn, USA","coords":[40.67,-74.01],"type":"retail","icon":"shopping-cart","product":"Retail Store","capacity":3000,"initial_stock":500},"N9_FR":{"name":"IKEA Paris Nord, France","coords":[48.98,2.49],"type":"retail","icon":"shopping-cart","product":"Retail Store","capacity":3000,"initial_stock":500},"N10_IT":{"name":"IKEA Milan, Italy","coords":[45.54,9.2],"type":"retail","icon":"shopping-cart","product":"Retail Store","capacity":3000,"initial_stock":500}},
+        // All route paths as one flat lat/lng column; routeOffsets[routeId] is its [start, end) slice
+        routeCoordsFlat: new Float32Array([22.54,114.05,34.34,108.93,43.82,87.61,43.22,76.85,55.76,37.62,53.9,27.56,52.24,15.91,57.748013,14.494363,57.723545,14.394138,57.69936,14.306362,57.648621,14.187852,57.47259,14.09886,57.123923,14.059439,56.922504,13.974686,56.743328,13.855631,56.61152,13.751478,56.509586,13.655645,56.330325,13.44819,56.268667,13.322035,56.124503,12.907556,56.038484,12.786134,55.86225,12.882627,55.756117,12.997425,55.702768,13.097492,55.550988,13.058449,55.58264,12.796533,55.615652,12.452617,55.587093,12.265678,55.478959,12.100264,55.458852,11.553223,55.40541,11.401946,55.334694,10.979746,55.328517,10.802856,55.365613,10.525311,55.380188,10.281519,55.497096,9.799318,55.545655,9.523958,55.477518,9.423759,55.212507,9.372242,55.082233,9.372494,54.825523,9.326905,54.723556,9.396917,54.580802,9.467132,54.421178,9.604082,54.324291,9.735966,54.186946,9.935487,54.075945,9.92382,54.013625,10.101641,53.98611,10.191207,53.882075,10.309018,53.779565,10.327045,53.699123,10.369486,53.55949,10.407666,53.512556,10.842819,53.46518,11.337404,53.413033,11.556818,53.301317,11.931152,53.165285,12.376249,53.111286,12.472168,52.90079,12.744346,52.761599,12.830088,52.679835,13.383084,52.498285,13.75009,52.420741,13.785213,52.310291,13.824701,52.334307,14.064114,52.335075,14.754114,52.324663,15.062653,52.324069,15.540223,52.333218,15.872894,52.240283,15.919054,45.650128,25.599879,45.6973,25.448831,45.766595,25.438194,45.745033,25.292535,45.77089,25.231371,45.843615,24.971937,45.726765,24.365147,45.738533,24.208504,45.803235,24.053897,45.886624,23.848274,45.942649,23.594141,45.894719,23.282873,45.883461,22.987886,45.933545,22.759158,45.901734,22.504079,45.847186,22.322442,45.774343,21.760478,45.848892,21.33987,46.100369,21.334535,46.200217,21.078116,46.28296,20.261975,46.302669,20.044263,46.611201,19.838805,46.895729,19.620807,47.155227,19.456055,47.367173,19.164227,47.420296,18.947584,47.511175,18.64696,47.548086,18.495393,47.620338,18.333031,47.679149,17.934417,47.800622,17.308255,47.946285,17.165997,48.052169,17.106118,48.247538,17.013512,48.440543,17.043113,48.661805,16.990979,49.146612,16.631441,49.254902,16.346532,49.374931,15.95223,49.48048,15.987214,49.695922,15.818072,49.795019,15.810063,49.879234,15.818297,49.973654,15.784762,50.046518,15.743487,50.151702,15.741281,50.375447,15.904234,50.545497,15.912481,50.628986,15.909161,50.702032,15.998499,50.799471,16.06747,50.918432,16.15451,51.031739,16.223211,51.134658,16.087697,51.35719,16.176866,51.441692,16.14394,51.533916,16.053668,51.621703,15.938405,51.837168,15.675843,51.996363,15.576106,52.097245,15.708457,52.16644,15.845224,52.240283,15.919054,49.480057,8.43993,49.508507,8.407597,49.546508,8.393076,49.834522,8.592958,50.024265,8.592719,50.132543,8.590302,50.215405,8.662683,50.318036,8.69196,50.373902,8.70586,50.459856,8.718984,50.545353,8.782402,50.638004,8.942163,50.658531,9.017122,50.710443,9.065794,50.737388,9.024955,50.821024,9.048723,50.849013,9.047621,50.892092,9.130288,50.915247,9.15252,51.034246,9.234973,51.11334,9.305185,51.147974,9.296202,51.190945,9.394778,51.285023,9.481846,51.29251,9.558592,51.362061,9.61838,51.396538,9.670497,51.395247,9.779929,51.562845,9.879912,51.598488,9.904063,51.659125,9.915599,51.727705,9.957399,51.796484,10.083206,51.933534,10.145272,52.062488,10.193393,52.10786,10.186248,52.145465,10.351104,52.194953,10.410288,52.235175,10.516154,52.246797,10.607914,52.308282,10.730819,52.308818,10.832256,52.233111,11.024524,52.187229,11.351707,52.164758,11.519842,52.228906,11.762647,52.25244,12.214707,52.264709,12.342002,52.338651,12.510057,52.335215,12.661226,52.290433,12.918836,52.300359,13.248556,52.306175,13.441483,52.324556,13.715312,52.316393,13.898101,52.334307,14.064114,52.324286,14.291051,52.328539,14.843613,52.324663,15.062653,52.294301,15.281946,52.324069,15.540223,52.333218,15.872894,52.270181,15.88584,52.240283,15.919054,52.240283,15.919054,52.248897,15.918421,52.311789,15.865499,52.333296,15.873157,52.299095,15.65738,52.324179,15.540202,52.318591,15.392834,52.325464,15.165746,52.324784,15.062662,52.338496,14.954018,52.335197,14.754335,52.314387,14.543531,52.344037,14.180784,52.334385,14.063821,52.311729,13.95857,52.310434,13.823873,52.324704,13.71591,52.310862,13.645945,52.306277,13.440768,52.308791,13.279891,52.303765,12.97824,52.291026,12.91791,52.337847,12.8078,52.350277,12.602084,52.35131,12.554019,52.28008,12.442295,52.264851,12.341938,52.247405,12.295872,52.232822,12.056587,52.229038,11.762579,52.218345,11.679778,52.164866,11.51587,52.188242,11.436414,52.21814,11.062243,52.233171,11.024998,52.26411,10.982925,52.31354,10.527215,52.338924,10.380266,52.33699,10.238158,52.366829,10.077797,52.388211,9.995472,52.43095,9.805117,52.421117,9.542881,52.413738,9.517441,52.288654,9.357726,52.236826,9.273471,52.22219,9.01991,52.204442,8.837029,52.151675,8.805379,52.110893,8.733567,52.071331,8.66557,52.000002,8.620345,51.942355,8.541197,51.907613,8.506908,51.873405,8.411609,51.835616,8.264858,51.823998,8.188368,51.725142,7.980623,51.69915,7.974145,51.647174,7.914601,51.601273,7.709676,51.579213,7.492046,51.534672,7.517069,51.510259,7.460352,51.510259,7.460352,51.492672,7.355698,51.49608,7.189626,51.472105,7.100222,51.460612,6.882386,51.44205,6.817557,51.435012,6.746837,51.426544,6.51253,51.412235,6.474658,51.389739,6.343529,51.380128,6.240186,51.396043,6.165709,51.377814,5.992659,51.377799,5.918907,51.423388,5.681395,51.405123,5.550854,51.404606,5.426865,51.326547,5.230903,51.29483,5.107489,51.295041,4.884534,51.240986,4.68073,51.217333,4.44991,51.194808,4.432326,51.213441,4.349299,51.125857,4.076868,51.07883,4.003963,51.036146,3.758846,51.075605,3.449873,51.161324,3.199742,51.147703,2.902149,51.112055,2.754103,51.057352,2.671809,51.042916,2.520101,51.042976,2.47197,51.01081,2.333986,50.960677,2.209226,50.957927,2.152952,50.933591,1.88698,50.927397,1.811082,50.926735,1.817525,50.954838,1.717582,51.068283,1.40919,51.106669,1.29643,51.091575,1.124592,51.095906,1.140938,51.091635,1.07882,51.115808,0.951794,51.190915,0.791215,51.226085,0.693728,51.296878,0.51319,51.398273,0.450795,51.402612,0.405522,51.427347,0.240252,51.447886,0.235738,51.486045,0.266457,51.499095,0.229689,51.531215,0.136508,51.554665,0.066914,51.600738,-0.015989,51.612919,-0.035921,51.587994,-0.207649,51.565281,-0.249904,51.553127,-0.254392,51.550119,-0.27036,51.510259,7.460352,51.497498,7.267897,51.442758,7.293788,51.38253,7.261094,51.363185,7.275743,51.250079,7.225104,51.217951,7.249584,51.207968,7.25218,51.171827,7.237892,51.150858,7.206191,51.127594,7.183055,51.078661,7.125962,51.038822,6.998143,50.987266,6.860609,50.927347,6.84443,50.927161,6.760446,50.892407,6.638759,50.851658,6.498923,50.835564,6.435494,50.805728,6.169344,50.772603,6.17637,50.723975,6.129895,50.649442,5.998687,50.63474,5.754064,50.674564,5.678827,50.689126,5.620676,50.67002,5.487044,50.618913,5.413749,50.59348,5.30803,50.529754,5.097716,50.494964,4.794836,50.49362,4.63249,50.481811,4.449858,50.474411,4.412239,50.478604,4.293329,50.503559,4.170493,50.476016,4.04307,50.492069,3.988851,50.462128,3.92775,50.454405,3.908822,50.4424,3.678042,50.417392,3.630197,50.338491,3.562025,50.304724,3.376599,50.250344,3.316784,50.189727,3.196566,50.163028,3.170493,50.08414,3.034998,50.019371,2.881192,49.957689,2.854454,49.885579,2.838151,49.793021,2.804041,49.710917,2.772446,49.602993,2.753958,49.446317,2.697068,49.36423,2.703789,49.274137,2.695344,49.249817,2.679036,49.162507,2.59755,49.099375,2.550114,49.063217,2.552147,48.993957,2.51758,48.998638,2.508595,48.978169,2.488485,51.510259,7.460352,51.443656,7.29392,51.363185,7.275743,51.251123,7.225233,51.191283,7.236554,51.115474,7.150112,50.987056,7.013654,50.894473,7.16679,50.828023,7.202056,50.714492,7.242243,50.599901,7.433169,50.526092,7.613344,50.501969,7.730565,50.443391,7.914416,50.37954,8.087905,50.243337,8.245467,50.1813,8.26843,50.048978,8.394287,49.983112,8.465308,49.904087,8.518002,49.764659,8.543954,49.671256,8.555712,49.437284,8.540178,49.332927,8.559537,49.216601,8.602961,49.113807,8.549671,48.972438,8.435627,48.877466,8.259741,48.511082,7.910562,48.429791,7.889939,48.292797,7.787706,48.16234,7.755353,47.971286,7.720411,47.870238,7.567874,47.786083,7.536806,47.667382,7.524374,47.544998,7.615524,47.476766,7.779429,47.348307,7.836086,47.312763,7.807333,47.209809,7.97995,47.179226,8.116528,47.074279,8.294184,47.054022,8.296655,46.977985,8.31241,46.972327,8.438575,46.934635,8.565363,46.861495,8.635376,46.808677,8.660069,46.700329,8.597018,46.569014,8.57367,46.490047,8.743565,46.466747,8.81839,46.356592,8.955386,46.246117,9.013444,46.198546,9.012065,46.126687,8.918165,46.082522,8.920965,46.005432,8.91484,45.95182,8.965006,45.843491,9.00016,45.830175,9.041739,45.575606,9.010639,45.539915,9.198014,51.51,7.46,40.67,-74.01]),
+        routeOffsets: {"china_poland":[0,14],"sweden_poland":[14,142],"romania_poland":[142,270],"germany_poland":[270,398],"poland_germany":[398,526],"germany_uk":[526,654],"germany_france":[654,782],"germany_italy":[782,910],"germany_usa":[910,914]},
+        facilityFeatures: [{"type":"Feature","geometry":{"type":"Point","coordinates":[14.5,57.75]},"properties":{"id":"N1_SWE","name":"Sm\u00e5land Forests, Sweden","product":"Pine Timber","type":"Raw_Materials","capacity":10000,"icon_color":"green","icon":"tree"}},{"type":"Feature","geometry":{"type":"Point","coordinates":[25.6,45.65]},"properties":{"id":"N2_ROM","name":"Brasov, Romania","product":"Pine Timber","type":"Raw_Materials","capacity":8000,"icon_color":"green","icon":"tree"}},{"type":"Feature","geometry":{"type":"Point","coordinates":[8.44,49.48]},"properties":{"id":"N3_DE","name":"BASF Ludwigshafen, Germany","product":"Glue/Resin","type":"Raw_Materials","capacity":5000,"icon_color":"green","icon":"flask"}},{"type":"Feature","geometry":{"type":"Point","coordinates":[114.05,22.54]},"properties":{"id":"N4_CN","name":"Shenzhen Supplier, China","product":"Metal Fittings","type":"Raw_Materials","capacity":12000,"icon_color":"green","icon":"cogs"}},{"type":"Feature","geometry":{"type":"Point","coordinates":[15.91,52.24]},"properties":{"id":"N5_FAC","name":"IKEA Industry Zb\u0105szynek, Poland","product":"Billy Bookshelf Assembly","type":"Manufacturing","capacity":15000,"icon_color":"blue","icon":"industry"}},{"type":"Feature","geometry":{"type":"Point","coordinates":[7.46,51.51]},"properties":{"id":"N6_DC","name":"IKEA DC Dortmund, Germany","product":"Distribution Hub","type":"Distribution","capacity":20000,"icon_color":"orange","icon":"warehouse"}},{"type":"Feature","geometry":{"type":"Point","coordinates":[-0.27,51.55]},"properties":{"id":"N7_UK","name":"IKEA Wembley, UK","product":"Retail Store","type":"Retail","capacity":3000,"icon_color":"red","icon":"shopping-cart"}},{"type":"Feature","geometry":{"type":"Point","coordinates":[-74.01,40.67]},"properties":{"id":"N8_US","name":"IKEA Brooklyn, USA","product":"Retail Store","type":"Retail","capacity":3000,"icon_color":"red","icon":"shopping-cart"}},{"type":"Feature","geometry":{"type":"Point","coordinates":[2.49,48.98]},"properties":{"id":"N9_FR","name":"IKEA Paris Nord, France","product":"Retail Store","type":"Retail","capacity":3000,"icon_color":"red","icon":"shopping-cart"}},{"type":"Feature","geometry":{"type":"Point","coordinates":[9.2,45.54]},"properties":{"id":"N10_IT","name":"IKEA Milan, Italy","product":"Retail Store","type":"Retail","capacity":3000,"icon_color":"red","icon":"shopping-cart"}}],
+        // Per-scenario rate adjustments, generated in Python; applyScenario points at the active one
+        scenarioAppliers: {
+            baseline: function() {
+            },
+            green_rail: function() {
+            },
+            local_source: function() {
+                this.productionRateArr[0] *= 0; // N1_SWE
+                this.productionRateArr[4] *= 1.5; // N5_FAC
+            }
         },
+        co2Categories: { truck: 'truck', train: 'rail', plane: 'air' },
+        movingMarkers: {},
+        // Cumulative CO2 in one flat column: co2Arr[scenario * 3 + category]
+        SCENARIO_IDX: { baseline: 0, green_rail: 1, local_source: 2 },
+        CO2_CATEGORY_IDX: { truck: 0, rail: 1, air: 2 },
+        co2Arr: new Float64Array(9),
+        // Running per-scenario totals across all categories, indexed by SCENARIO_IDX
+        co2TotalArr: new Float64Array(3),
+        // Last day plotted on the scenario chart, which keeps a sliding window of days
+        lastPlottedDay: null,
+        maxChartPoints: 365,
         charts: {},
+        chartUpdatePending: false,
+        lastStock: {},
+        popupStockEls: {},
+        inspectedNodeId: null,
+        lastDisplaySec: -1,
+        lastChartMinute: -1,
+        lastChartUpdate: -Infinity,
+        // Fixed simulation step in wall-clock milliseconds
+        tickMs: 100,
+        vehicleDwellSec: 3,
+        tickAccumulator: 0,
+        lastFrameTs: null,
+        // Seasonality multiplier by month (index 1-12, 0 unused), cached for the current day
+        SEASON: new Float64Array([1.0,1.3,1.0,1.0,1.0,1.0,0.8,0.8,1.8,1.8,1.0,1.0,1.0]),
+        seasonMultiplier: 1.0,
+        eventQueue: [],
 
         init: function() {
             console.log('IKEA Simulation init starting...');
+
+            this.initStateArrays();
+            this.updateCalendar();
+            this.applyScenario = this.scenarioAppliers[this.currentScenario];
+
+            // Static UI elements are looked up once; popup inventory spans come and go
+            this.dom = {
+                currentDate: document.getElementById('currentDate'),
+                simTime: document.getElementById('simTime'),
+                seasonMultiplier: document.getElementById('seasonMultiplier'),
+                playPauseBtn: document.getElementById('playPauseBtn'),
+                speedValue: document.getElementById('speedValue'),
+                inspectorContent: document.getElementById('inspectorContent'),
+                inspectorPanel: document.getElementById('inspectorPanel'),
+                inspectorToggle: document.querySelector('#inspectorPanel .panel-toggle')
+            };
             // Moving markers functionality
 
             this.createMovingMarker = function(routeId, vehicleType) {
-                console.log('Creating moving marker for route:', routeId, 'type:', vehicleType);
-                const routeCoords = this.routeCoordinates[routeId];
-                console.log('Route coordinates:', routeCoords);
+                DEBUG && console.log('Creating moving marker for route:', routeId, 'type:', vehicleType);
+                const offsets = this.routeOffsets[routeId];
+                const pointCount = offsets ? (offsets[1] - offsets[0]) / 2 : 0;
 
-                if (!routeCoords || routeCoords.length < 2) {
-                    console.log('Invalid route coordinates for', routeId);
+                if (pointCount < 2) {
+                    DEBUG && console.log('Invalid route coordinates for', routeId);
                     return null;
                 }
 
+                // Distance and travel time are precomputed in Python
                 const route = this.routesData[routeId];
-                const speedKmh = route.speed;
-                const distance = this.calculateRouteDistance(routeCoords);
-                const duration = (distance / speedKmh) * 3600000 / this.simulationSpeed;
-
-                console.log('Route distance:', distance, 'km, duration:', duration, 'ms');
-
-                const iconHtml = this.getVehicleIcon(vehicleType);
-                console.log('Vehicle icon HTML:', iconHtml);
+                const distance = route.distance_km;
+                // Trip time in simulated milliseconds; playback speed is applied per frame
+                const duration = route.duration_s * 1000;
+
+                DEBUG && console.log('Route distance:', distance, 'km, duration:', duration, 'ms');
+
+                // Simulated time at which the vehicle reaches the end of each segment,
+                // split in proportion to the segment lengths precomputed in Python
+                const segmentEnds = new Float64Array(pointCount - 1);
+                let totalKm = 0;
+                for (let i = 0; i < segmentEnds.length; i++) {
+                    totalKm += route.segment_km[i];
+                    segmentEnds[i] = totalKm;
+                }
+                for (let i = 0; i < segmentEnds.length; i++) {
+                    segmentEnds[i] = totalKm > 0 ? duration * segmentEnds[i] / totalKm : duration * (i + 1) / segmentEnds.length;
+                }
 
             try {
                 // Create a simple moving marker using standard Leaflet
-                const marker = L.marker(routeCoords[0], {
-                    icon: L.divIcon({
-                        html: iconHtml,
-                        className: 'vehicle-icon',
-                        iconSize: [30, 30],
-                        iconAnchor: [15, 15]
-                    })
+                // One LatLng per vehicle, updated in place as it moves
+                const latLng = L.latLng(this.routeCoordsFlat[offsets[0]], this.routeCoordsFlat[offsets[0] + 1]);
+                const marker = L.marker(latLng, {
+                    icon: this.vehicleIcons[vehicleType] || this.vehicleIcons.truck
                 }).addTo(this.map);
 
-                console.log('Moving marker created successfully for', routeId);
+                DEBUG && console.log('Moving marker created successfully for', routeId);
 
                 this.movingMarkers[routeId] = {
                     marker: marker,
+                    latLng: latLng,
                     routeId: routeId,
                     vehicleType: vehicleType,
-                    routeCoords: routeCoords,
+                    coordStart: offsets[0],
+                    coordEnd: offsets[1],
                     duration: duration,
+                    segmentEnds: segmentEnds,
+                    departTime: 0,
+                    elapsed: 0,
                     distance: distance,
                     isMoving: false,
                     lastStartTime: 0,
-                    currentPosition: 0, // index in routeCoords
-                    animationId: null
+                    currentPosition: 0 // index of the segment being travelled
                 };
 
                 return marker;
@@ -89,89 +154,110 @@
                 }
             };
 
-            this.getVehicleIcon = function(vehicleType) {
-                const icons = {
-                    truck: '<div style="color: blue; font-size: 20px;">🚛</div>',
-                    rail: '<div style="color: green; font-size: 20px;">🚂</div>',
-                    air: '<div style="color: red; font-size: 20px;">✈️</div>',
-                    multimodal: '<div style="color: purple; font-size: 20px;">🚛</div>'
-                };
-                return icons[vehicleType] || icons.truck;
-            };
-
-            this.calculateRouteDistance = function(coords) {
-                let totalDistance = 0;
-                for (let i = 1; i < coords.length; i++) {
-                    totalDistance += this.calculateDistance(
-                        coords[i-1][0], coords[i-1][1],
-                        coords[i][0], coords[i][1]
-                    );
-                }
-                return totalDistance;
+            // One shared divIcon per vehicle type instead of one per marker
+            const iconHtml = {
+                truck: '<div style="color: blue; font-size: 20px;">🚛</div>',
+                rail: '<div style="color: green; font-size: 20px;">🚂</div>',
+                air: '<div style="color: red; font-size: 20px;">✈️</div>',
+                multimodal: '<div style="color: purple; font-size: 20px;">🚛</div>'
             };
+            this.vehicleIcons = {};
+            Object.keys(iconHtml).forEach(type => {
+                this.vehicleIcons[type] = L.divIcon({
+                    html: iconHtml[type],
+                    className: 'vehicle-icon',
+                    iconSize: [30, 30],
+                    iconAnchor: [15, 15]
+                });
+            });
 
             this.startVehicleMovement = function(routeId) {
-                console.log('Starting vehicle movement for', routeId);
+                DEBUG && console.log('Starting vehicle movement for', routeId);
+                if (!this.movingMarkers[routeId]) {
+                    this.createMovingMarker(routeId, this.routesData[routeId].mode);
+                }
                 const vehicle = this.movingMarkers[routeId];
-                if (vehicle && !vehicle.isMoving && vehicle.routeCoords.length > 1) {
+                if (vehicle && !vehicle.isMoving) {
                     vehicle.isMoving = true;
                     vehicle.lastStartTime = Date.now();
                     vehicle.currentPosition = 0;
+                    vehicle.departTime = this.simulationTime;
+                    vehicle.elapsed = 0;
+                    this.activeVehicles.push(vehicle);
+                }
+            };
 
-                    // Calculate step duration based on total duration and number of steps
-                    const stepDuration = vehicle.duration / (vehicle.routeCoords.length - 1);
+            // Vehicles move on the simulation clock, positioned once per frame from simulationStep
+            this.activeVehicles = [];
+            this.parkedVehicles = [];
 
-                    const animate = () => {
-                        if (!vehicle.isMoving) return;
+            this.advanceVehicles = function(renderTime) {
+                const coords = this.routeCoordsFlat;
+                let arrivals = 0;
+                for (let v = 0; v < this.activeVehicles.length; v++) {
+                    const vehicle = this.activeVehicles[v];
+                    const ends = vehicle.segmentEnds;
+                    vehicle.elapsed = (renderTime - vehicle.departTime) * 1000;
 
+                    while (vehicle.currentPosition < ends.length && vehicle.elapsed >= ends[vehicle.currentPosition]) {
                         vehicle.currentPosition++;
+                    }
 
-                        if (vehicle.currentPosition >= vehicle.routeCoords.length) {
-                            // Vehicle has reached the end
-                            this.onVehicleArrival(routeId);
-                            return;
-                        }
-
-                        // Move marker to next position
-                        const nextCoord = vehicle.routeCoords[vehicle.currentPosition];
-                        vehicle.marker.setLatLng(nextCoord);
+                    if (vehicle.currentPosition >= ends.length) {
+                        // Vehicle has reached the end
+                        this.placeVehicle(vehicle, vehicle.coordEnd - 2);
+                        arrivals++;
+                        continue;
+                    }
 
-                        // Schedule next movement
-                        vehicle.animationId = setTimeout(animate, stepDuration);
-                    };
+                    // Interpolate along the current segment, writing into the vehicle's own LatLng
+                    const k = vehicle.currentPosition;
+                    const segmentStart = k > 0 ? ends[k - 1] : 0;
+                    const span = ends[k] - segmentStart;
+                    const frac = span > 0 ? (vehicle.elapsed - segmentStart) / span : 1;
+                    const a = vehicle.coordStart + 2 * k;
+                    vehicle.latLng.lat = coords[a] + (coords[a + 2] - coords[a]) * frac;
+                    vehicle.latLng.lng = coords[a + 1] + (coords[a + 3] - coords[a + 1]) * frac;
+                    vehicle.marker.setLatLng(vehicle.latLng);
+                }
 
-                    // Start animation
-                    animate();
+                if (arrivals) {
+                    // Compact the active list in place, handing arrived vehicles over as we go
+                    const active = this.activeVehicles;
+                    let kept = 0;
+                    for (let v = 0; v < active.length; v++) {
+                        const vehicle = active[v];
+                        if (vehicle.currentPosition < vehicle.segmentEnds.length) {
+                            active[kept++] = vehicle;
+                        } else {
+                            this.onVehicleArrival(vehicle.routeId);
+                        }
+                    }
+                    active.length = kept;
                 }
             };
 
             this.onVehicleArrival = function(routeId) {
-                console.log('Vehicle arrived at destination for', routeId);
+                DEBUG && console.log('Vehicle arrived at destination for', routeId);
                 const vehicle = this.movingMarkers[routeId];
                 if (vehicle) {
                     vehicle.isMoving = false;
-                    setTimeout(() => {
-                        if (this.movingMarkers[routeId]) {
-                            this.resetVehiclePosition(routeId);
-                        }
-                    }, 3000);
+                    this.scheduleSpawn(routeId);
+                    // Park at the destination for a moment before returning to the origin
+                    vehicle.resetSimTime = this.simulationTime + this.vehicleDwellSec;
+                    this.parkedVehicles.push(vehicle);
                 }
             };
 
             this.resetVehiclePosition = function(routeId) {
                 const vehicle = this.movingMarkers[routeId];
                 if (vehicle) {
-                    // Clear any ongoing animation
-                    if (vehicle.animationId) {
-                        clearTimeout(vehicle.animationId);
-                        vehicle.animationId = null;
-                    }
+                    // Take it off the simulation clock
+                    this.activeVehicles = this.activeVehicles.filter(active => active !== vehicle);
+                    this.parkedVehicles = this.parkedVehicles.filter(parked => parked !== vehicle);
 
                     // Reset to starting position
-                    const routeCoords = this.routeCoordinates[routeId];
-                    if (routeCoords && routeCoords.length > 0) {
-                        vehicle.marker.setLatLng(routeCoords[0]);
-                    }
+                    this.placeVehicle(vehicle, vehicle.coordStart);
                     vehicle.isMoving = false;
                     vehicle.currentPosition = 0;
                 }
@@ -192,16 +278,24 @@
             // Store map reference
             this.map = theMap;
 
-                Object.keys(this.routesData).forEach(routeId => {
-                    const route = this.routesData[routeId];
-                    this.createMovingMarker(routeId, route.vehicle);
-                });
+                this.departureQueue = [];
+                // No markers are created here: first departures are queued for time zero and
+                // dispatched by the first tick after Play, which creates each route's marker
+                const routeIds = this.routeIds;
+                for (let i = 0, n = routeIds.length; i < n; i++) {
+                    this.scheduleSpawn(routeIds[i], true);
+                }
+            };
 
-                // Force start a test vehicle immediately
-                setTimeout(() => {
-                    console.log('Starting test vehicle...');
-                    this.startVehicleMovement('china_poland'); // Start China->Poland train
-                }, 2000);
+            this.scheduleSpawn = function(routeId, first) {
+                // Every route's first departure leaves straight away; after that departures form
+                // a Poisson process with an exponential wait between them
+                // (route frequency is the mean number of days between departures)
+                const meanInterval = this.routesData[routeId].frequency * 86400;
+                this.pushEvent(this.departureQueue, {
+                    t: first ? this.simulationTime : this.simulationTime - Math.log(1 - Math.random()) * meanInterval,
+                    routeId: routeId
+                });
             };
 
             this.updateMovingMarkers = function() {
@@ -212,29 +306,121 @@
                         return;
                     }
 
-                    Object.keys(this.routesData).forEach(routeId => {
-                        const route = this.routesData[routeId];
+                    // Only the departures that are due are touched; each route has at most one
+                    // pending, and the next one is drawn when its vehicle arrives
+                    const queue = this.departureQueue;
+                    while (queue.length && queue[0].t <= this.simulationTime) {
+                        const routeId = this.popEvent(queue).routeId;
                         const vehicle = this.movingMarkers[routeId];
+                        if (!vehicle || !vehicle.isMoving) {
+                            this.startVehicleMovement(routeId);
+                        }
+                    }
 
-                        if (vehicle && !vehicle.isMoving) {
-                            const startChance = (1 / route.frequency) * (this.simulationTime / 3600);
-                            if (Math.random() < startChance * 0.5) {
-                                this.startVehicleMovement(routeId);
-                            }
+                    // Send parked vehicles home once their dwell is over, unless they've left again
+                    const parked = this.parkedVehicles;
+                    let kept = 0;
+                    for (let v = 0; v < parked.length; v++) {
+                        const vehicle = parked[v];
+                        if (this.simulationTime < vehicle.resetSimTime) {
+                            parked[kept++] = vehicle;
+                        } else if (!vehicle.isMoving) {
+                            this.placeVehicle(vehicle, vehicle.coordStart);
+                            vehicle.currentPosition = 0;
                         }
-                    });
+                    }
+                    parked.length = kept;
                 } catch (error) {
                     console.error('CRITICAL: Error updating moving markers:', error.message || error);
                 }
             };
 
             console.log('Moving marker code loaded');
+            if (!theMap) {
+                theMap = window[mapId];
+            }
+            if (theMap) {
+                this.addFacilityMarkers();
+                this.addRoutePaths();
+                this.initializeMovingMarkers();
+            } else {
+                console.error('CRITICAL: Map not available for facility markers and routes');
+            }
             this.setupEventListeners();
             this.initCharts();
             this.updateDisplay();
             console.log('IKEA Simulation initialized');
         },
 
+        initStateArrays: function() {
+            // Node state lives in parallel typed arrays indexed by position in nodeIds;
+            // nodeState only carries the initial values from Python
+            const nodeIds = Object.keys(this.nodeState);
+            const n = nodeIds.length;
+            this.nodeIds = nodeIds;
+            this.nodeIdToIdx = {};
+            this.stockArr = new Float64Array(n);
+            this.capacityArr = new Float64Array(n);
+            this.productionRateArr = new Float64Array(n);
+            this.salesRateArr = new Float64Array(n);
+            this.inboundRateArr = new Float64Array(n);
+            this.outboundRateArr = new Float64Array(n);
+            const manufacturing = [];
+            const retail = [];
+            for (let i = 0; i < n; i++) {
+                const nodeId = nodeIds[i];
+                const state = this.nodeState[nodeId];
+                const type = this.nodesData[nodeId].type;
+                this.nodeIdToIdx[nodeId] = i;
+                this.stockArr[i] = state.stock;
+                this.capacityArr[i] = state.capacity;
+                this.productionRateArr[i] = state.production_rate;
+                this.salesRateArr[i] = state.sales_rate;
+                this.inboundRateArr[i] = state.inbound_rate;
+                this.outboundRateArr[i] = state.outbound_rate;
+                if (type === 'manufacturing') manufacturing.push(i);
+                else if (type === 'retail') retail.push(i);
+            }
+            // Producing and selling nodes are updated in their own loops each tick
+            this.manufacturingIdx = Int32Array.from(manufacturing);
+            this.retailIdx = Int32Array.from(retail);
+
+            // Routes get the same treatment; shipment distances come precomputed from Python
+            const routeIds = Object.keys(this.routesData);
+            const r = routeIds.length;
+            this.routeIds = routeIds;
+            this.routeFromIdx = new Int32Array(r);
+            this.routeToIdx = new Int32Array(r);
+            this.routeCapacity = new Float64Array(r);
+            this.routeEmission = new Float64Array(r);
+            this.routeDistanceKm = new Float64Array(r);
+            this.routeTravelSec = new Float64Array(r);
+            this.routeCo2Offset = new Uint8Array(r);
+            for (let i = 0; i < r; i++) {
+                const route = this.routesData[routeIds[i]];
+                const distance = route.direct_km;
+                this.routeFromIdx[i] = this.nodeIdToIdx[route.from];
+                this.routeToIdx[i] = this.nodeIdToIdx[route.to];
+                this.routeCapacity[i] = route.capacity;
+                this.routeEmission[i] = route.emission;
+                this.routeDistanceKm[i] = distance;
+                this.routeTravelSec[i] = distance / route.speed * 3600;
+                this.routeCo2Offset[i] = this.CO2_CATEGORY_IDX[this.co2Categories[route.vehicle]];
+            }
+        },
+
+        getNodeState: function(nodeId) {
+            const i = this.nodeIdToIdx[nodeId];
+            return {
+                stock: this.stockArr[i],
+                capacity: this.capacityArr[i],
+                inbound_rate: this.inboundRateArr[i],
+                outbound_rate: this.outboundRateArr[i],
+                production_rate: this.productionRateArr[i],
+                sales_rate: this.salesRateArr[i]
+            };
+        },
+
         setupEventListeners: function() {
             console.log('Setting up event listeners...');
             const playBtn = document.getElementById('playPauseBtn');
@@ -257,7 +443,7 @@
             if (speedSlider) {
                 speedSlider.addEventListener('input', (e) => {
                     this.simulationSpeed = parseFloat(e.target.value);
-                    document.getElementById('speedValue').textContent = this.simulationSpeed.toFixed(1) + 'x';
+                    this.dom.speedValue.textContent = this.simulationSpeed.toFixed(1) + 'x';
                 });
             }
 
@@ -265,6 +451,7 @@
             if (scenarioSelector) {
                 scenarioSelector.addEventListener('change', (e) => {
                     this.currentScenario = e.target.value;
+                    this.applyScenario = this.scenarioAppliers[this.currentScenario];
                 });
             }
             
@@ -275,7 +462,7 @@
 
         toggleSimulation: function() {
             this.isPlaying = !this.isPlaying;
-            const btn = document.getElementById('playPauseBtn');
+            const btn = this.dom.playPauseBtn;
             if (this.isPlaying) {
                 btn.textContent = 'Pause';
                 btn.classList.add('pause');
@@ -289,139 +476,177 @@
 
         resetSimulation: function() {
             this.stopSimulation();
-            this.currentDate = new Date(this.startDate);
             this.simulationTime = 0;
+            this.lastDisplaySec = -1;
+            this.lastChartMinute = -1;
+            this.updateCalendar();
             this.isPlaying = false;
+            this.eventQueue = [];
 
-            Object.keys(this.nodeState).forEach(nodeId => {
-                this.nodeState[nodeId].stock = this.nodesData[nodeId].initial_stock;
-                this.nodeState[nodeId].inbound_rate = 0;
-                this.nodeState[nodeId].outbound_rate = 0;
-            });
+            for (let i = 0; i < this.nodeIds.length; i++) {
+                this.stockArr[i] = this.nodesData[this.nodeIds[i]].initial_stock;
+            }
+            this.inboundRateArr.fill(0);
+            this.outboundRateArr.fill(0);
 
-            Object.keys(this.co2Data).forEach(scenario => {
-                this.co2Data[scenario] = { truck: 0, rail: 0, air: 0 };
-            });
+            this.co2Arr.fill(0);
+            this.co2TotalArr.fill(0);
 
-            this.scenarioComparison = {
-                baseline: [],
-                green_rail: [],
-                local_source: []
-            };
+            this.lastPlottedDay = null;
+
+            // Send every vehicle back to its origin and redraw departures from time zero
+            this.departureQueue = [];
+            for (let i = 0; i < this.routeIds.length; i++) {
+                const routeId = this.routeIds[i];
+                this.resetVehiclePosition(routeId);
+                this.scheduleSpawn(routeId, true);
+            }
 
             this.updateDisplay();
             this.updateCharts();
         },
 
-        getSeasonalityMultiplier: function(date) {
-            const month = date.getMonth() + 1;
-            if (month === 8 || month === 9) return 1.8;
-            if (month === 1) return 1.3;
-            if (month === 6 || month === 7) return 0.8;
-            return 1.0;
+        updateCalendar: function() {
+            const currentMs = this.startMs + this.simulationTime * 1000;
+            if (currentMs >= this.dayStartMs && currentMs < this.nextDayMs) return;
+
+            const date = new Date(currentMs);
+            this.currentMonth = date.getMonth() + 1;
+            this.seasonMultiplier = this.getSeasonalityMultiplier(this.currentMonth);
+            this.currentDateStr = this.MONTH_NAMES[date.getMonth()] + ' ' + date.getDate() + ', ' + date.getFullYear();
+            this.dayStartMs = new Date(date.getFullYear(), date.getMonth(), date.getDate()).getTime();
+            this.nextDayMs = new Date(date.getFullYear(), date.getMonth(), date.getDate() + 1).getTime();
         },
 
-        calculateDistance: function(lat1, lon1, lat2, lon2) {
-            const R = 6371;
-            const dLat = (lat2 - lat1) * Math.PI / 180;
-            const dLon = (lon2 - lon1) * Math.PI / 180;
-            const a = Math.sin(dLat/2) * Math.sin(dLat/2) +
-                     Math.cos(lat1 * Math.PI / 180) * Math.cos(lat2 * Math.PI / 180) *
-                     Math.sin(dLon/2) * Math.sin(dLon/2);
-            const c = 2 * Math.atan2(Math.sqrt(a), Math.sqrt(Math.sqrt(1-a)));
-            return R * c;
+        getSeasonalityMultiplier: function(month) {
+            return this.SEASON[month];
         },
 
-        updateNodeStates: function() {
-            const multiplier = this.getSeasonalityMultiplier(this.currentDate);
+        updateNodeStates: function(deltaTime) {
+            // Rates are per simulated hour; deltaTime is the simulated seconds in this tick
+            const multiplier = this.seasonMultiplier;
+
+            const stock = this.stockArr;
+            const capacity = this.capacityArr;
+            const production = this.productionRateArr;
+            const sales = this.salesRateArr;
+            const productionRate = 50 * multiplier;
+            const salesRate = 20 * multiplier;
+
+            const manufacturing = this.manufacturingIdx;
+            for (let k = 0, n = manufacturing.length; k < n; k++) {
+                const i = manufacturing[k];
+                production[i] = productionRate;
+                stock[i] = Math.min(capacity[i], stock[i] + productionRate * deltaTime / 3600);
+            }
 
-            Object.keys(this.nodeState).forEach(nodeId => {
-                const node = this.nodeState[nodeId];
-                if (this.nodesData[nodeId].type === 'manufacturing') {
-                    node.production_rate = 50 * multiplier;
-                    node.stock = Math.min(node.capacity, node.stock + node.production_rate / 3600);
-                }
-                if (this.nodesData[nodeId].type === 'retail') {
-                    node.sales_rate = 20 * multiplier;
-                    node.stock = Math.max(0, node.stock - node.sales_rate / 3600);
-                }
-                this.updateScenarioRates(nodeId);
-            });
+            const retail = this.retailIdx;
+            for (let k = 0, n = retail.length; k < n; k++) {
+                const i = retail[k];
+                sales[i] = salesRate;
+                stock[i] = Math.max(0, stock[i] - salesRate * deltaTime / 3600);
+            }
+            this.updateScenarioRates();
         },
 
-        updateScenarioRates: function(nodeId) {
-            this.nodeState[nodeId].inbound_rate = 0;
-            this.nodeState[nodeId].outbound_rate = 0;
+        updateScenarioRates: function() {
+            this.inboundRateArr.fill(0);
+            this.outboundRateArr.fill(0);
+            this.applyScenario();
+        },
 
-            if (this.currentScenario === 'green_rail') {
-                if (nodeId === 'N2_ROM') {
-                    // Reduce Romania outbound
-                }
-            } else if (this.currentScenario === 'local_source') {
-                if (nodeId === 'N1_SWE') {
-                    this.nodeState[nodeId].production_rate = 0;
-                }
-                if (nodeId === 'N5_FAC') {
-                    this.nodeState[nodeId].production_rate *= 1.5;
+        processShipments: function() {
+            const stock = this.stockArr;
+            const co2 = this.co2Arr;
+            const scenarioIdx = this.SCENARIO_IDX[this.currentScenario];
+            const co2Base = scenarioIdx * 3;
+
+            for (let r = 0, n = this.routeIds.length; r < n; r++) {
+                const fromIdx = this.routeFromIdx[r];
+                const capacity = this.routeCapacity[r];
+
+                if (stock[fromIdx] > capacity * 0.8) {
+                    const shipmentSize = Math.min(capacity, stock[fromIdx]);
+
+                    const emitted = shipmentSize * this.routeDistanceKm[r] * this.routeEmission[r];
+                    co2[co2Base + this.routeCo2Offset[r]] += emitted;
+                    this.co2TotalArr[scenarioIdx] += emitted;
+
+                    stock[fromIdx] -= shipmentSize;
+                    this.outboundRateArr[fromIdx] += shipmentSize;
+
+                    // Arrival is scheduled in simulated time, so it follows simulationSpeed
+                    this.pushEvent(this.eventQueue, {
+                        t: this.simulationTime + this.routeTravelSec[r],
+                        toIdx: this.routeToIdx[r],
+                        shipmentSize: shipmentSize
+                    });
                 }
             }
         },
 
-        processShipments: function() {
-            Object.keys(this.routesData).forEach(routeId => {
-                const route = this.routesData[routeId];
-                const fromNode = route.from;
-                const toNode = route.to;
-
-                if (this.nodeState[fromNode].stock > route.capacity * 0.8) {
-                    const shipmentSize = Math.min(route.capacity, this.nodeState[fromNode].stock);
-                    const distance = this.calculateDistance(
-                        this.nodesData[fromNode].coords[0], this.nodesData[fromNode].coords[1],
-                        this.nodesData[toNode].coords[0], this.nodesData[toNode].coords[1]
-                    );
-
-                    const emissions = shipmentSize * distance * route.emission;
-                    this.co2Data[this.currentScenario][route.vehicle] += emissions;
-
-                    this.nodeState[fromNode].stock -= shipmentSize;
-                    this.nodeState[fromNode].outbound_rate += shipmentSize;
-
-                    setTimeout(() => {
-                        this.nodeState[toNode].stock = Math.min(
-                            this.nodeState[toNode].capacity,
-                            this.nodeState[toNode].stock + shipmentSize
-                        );
-                        this.nodeState[toNode].inbound_rate += shipmentSize;
-                    }, (distance / route.speed) * 3600000);
+        processArrivals: function() {
+            const queue = this.eventQueue;
+            while (queue.length && queue[0].t <= this.simulationTime) {
+                const event = this.popEvent(queue);
+                const i = event.toIdx;
+                this.stockArr[i] = Math.min(this.capacityArr[i], this.stockArr[i] + event.shipmentSize);
+                this.inboundRateArr[i] += event.shipmentSize;
+            }
+        },
+
+        pushEvent: function(queue, event) {
+            // Binary min-heap on event time
+            let i = queue.push(event) - 1;
+            while (i > 0) {
+                const parent = (i - 1) >> 1;
+                if (queue[parent].t <= event.t) break;
+                queue[i] = queue[parent];
+                i = parent;
+            }
+            queue[i] = event;
+        },
+
+        popEvent: function(queue) {
+            const top = queue[0];
+            const last = queue.pop();
+            if (queue.length) {
+                let i = 0;
+                while (true) {
+                    let child = 2 * i + 1;
+                    if (child >= queue.length) break;
+                    if (child + 1 < queue.length && queue[child + 1].t < queue[child].t) child++;
+                    if (queue[child].t >= last.t) break;
+                    queue[i] = queue[child];
+                    i = child;
                 }
-            });
+                queue[i] = last;
+            }
+            return top;
         },
 
         updateDisplay: function() {
-            document.getElementById('currentDate').textContent =
-                this.currentDate.toLocaleDateString('en-US', {
-                    year: 'numeric',
-                    month: 'short',
-                    day: 'numeric'
-                });
+            // The clock readouts only change when a whole simulated second has passed
+            const totalSeconds = this.simulationTime | 0;
+            if (totalSeconds !== this.lastDisplaySec) {
+                this.lastDisplaySec = totalSeconds;
+                const hours = (totalSeconds / 3600) | 0;
+                const minutes = ((totalSeconds % 3600) / 60) | 0;
+                const seconds = totalSeconds % 60;
+                const pad = n => n < 10 ? '0' + n : '' + n;
+                this.dom.simTime.textContent = pad(hours) + ':' + pad(minutes) + ':' + pad(seconds);
+                this.dom.currentDate.textContent = this.currentDateStr;
+                this.dom.seasonMultiplier.textContent = this.seasonMultiplier.toFixed(1) + 'x';
+                if (this.inspectedNodeId) this.refreshInspector();
+            }
 
-            const hours = Math.floor(this.simulationTime / 3600);
-            const minutes = Math.floor((this.simulationTime % 3600) / 60);
-            const seconds = Math.floor(this.simulationTime % 60);
-            document.getElementById('simTime').textContent =
-                `${hours.toString().padStart(2, '0')}:${minutes.toString().padStart(2, '0')}:${seconds.toString().padStart(2, '0')}`;
-
-            document.getElementById('seasonMultiplier').textContent =
-                this.getSeasonalityMultiplier(this.currentDate).toFixed(1) + 'x';
-
-            Object.keys(this.nodeState).forEach(nodeId => {
-                const element = document.getElementById(`inventory-${nodeId}`);
-                if (element) {
-                    const stock = Math.round(this.nodeState[nodeId].stock);
-                    const capacity = this.nodeState[nodeId].capacity;
-                    element.innerHTML = `<strong>Stock:</strong> ${stock}/${capacity} units`;
-                }
-            });
+            // Only touch the open popups whose rounded stock actually changed
+            for (const nodeId in this.popupStockEls) {
+                const stock = Math.round(this.stockArr[this.nodeIdToIdx[nodeId]]);
+                if (this.lastStock[nodeId] === stock) continue;
+                this.popupStockEls[nodeId].textContent = stock;
+                this.lastStock[nodeId] = stock;
+            }
         },
 
         initCharts: function() {
@@ -439,6 +664,7 @@
                 options: {
                     responsive: true,
                     maintainAspectRatio: false,
+                    animation: false,
                     scales: {
                         y: { beginAtZero: true }
                     }
@@ -474,6 +700,7 @@
                 options: {
                     responsive: true,
                     maintainAspectRatio: false,
+                    animation: false,
                     scales: {
                         x: {
                             title: {
@@ -493,34 +720,40 @@
         },
 
         updateCharts: function() {
-            this.charts.co2Chart.data.datasets[0].data = [
-                this.co2Data[this.currentScenario].truck,
-                this.co2Data[this.currentScenario].rail,
-                this.co2Data[this.currentScenario].air
-            ];
-            this.charts.co2Chart.update();
+            // Coalesce chart redraws into at most one per animation frame
+            if (this.chartUpdatePending) return;
+            this.chartUpdatePending = true;
+            requestAnimationFrame(() => {
+                this.chartUpdatePending = false;
+                this.renderCharts();
+            });
+        },
 
-            const timeLabel = Math.round(this.simulationTime / 86400);
-            if (!this.scenarioComparison.baseline.includes(timeLabel)) {
-                ['baseline', 'green_rail', 'local_source'].forEach(scenario => {
-                    this.scenarioComparison[scenario].push(timeLabel);
-                });
+        renderCharts: function() {
+            const co2 = this.co2Arr;
+            const base = this.SCENARIO_IDX[this.currentScenario] * 3;
+            this.charts.co2Chart.data.datasets[0].data = Array.from(co2.subarray(base, base + 3));
+            this.charts.co2Chart.update('none');
 
-                this.charts.scenarioChart.data.labels.push(timeLabel);
-                this.charts.scenarioChart.data.datasets[0].data.push(
-                    this.co2Data.baseline.truck + this.co2Data.baseline.rail + this.co2Data.baseline.air
-                );
-                this.charts.scenarioChart.data.datasets[1].data.push(
-                    this.co2Data.green_rail.truck + this.co2Data.green_rail.rail + this.co2Data.green_rail.air
-                );
-                this.charts.scenarioChart.data.datasets[2].data.push(
-                    this.co2Data.local_source.truck + this.co2Data.local_source.rail + this.co2Data.local_source.air
-                );
-                this.charts.scenarioChart.update();
+            const timeLabel = Math.round(this.simulationTime / 86400);
+            if (timeLabel !== this.lastPlottedDay) {
+                this.lastPlottedDay = timeLabel;
+                const chart = this.charts.scenarioChart;
+
+                chart.data.labels.push(timeLabel);
+                // Datasets are in SCENARIO_IDX order
+                for (let i = 0; i < 3; i++) {
+                    chart.data.datasets[i].data.push(this.co2TotalArr[i]);
+                }
+                if (chart.data.labels.length > this.maxChartPoints) {
+                    chart.data.labels.shift();
+                    chart.data.datasets.forEach(dataset => dataset.data.shift());
+                }
+                chart.update('none');
             }
         },
 
-        simulationStep: function() {
+        simulationStep: function(timestamp) {
             try {
                 if (!this.isPlaying) return;
 
@@ -533,19 +766,38 @@
                     return;
                 }
 
-                const deltaTime = (1/60) * this.simulationSpeed;
-                this.simulationTime += deltaTime;
-                this.currentDate = new Date(this.startDate.getTime() + this.simulationTime * 1000);
+                // Simulation logic runs on a fixed wall-clock step; the display refreshes every frame.
+                // The backlog is capped so a backgrounded tab doesn't replay minutes of ticks at once.
+                if (this.lastFrameTs === null) this.lastFrameTs = timestamp;
+                this.tickAccumulator += Math.min(timestamp - this.lastFrameTs, 1000);
+                this.lastFrameTs = timestamp;
+
+                while (this.tickAccumulator >= this.tickMs) {
+                    this.tickAccumulator -= this.tickMs;
+                    const deltaTime = this.tickMs / 1000 * this.simulationSpeed;
+                    this.simulationTime += deltaTime;
+                    this.updateCalendar();
+
+                    this.processArrivals();
+                    this.updateNodeStates(deltaTime);
+                    this.processShipments();
+                    this.updateMovingMarkers();
+                }
 
-                this.updateNodeStates();
-                this.processShipments();
+                // Vehicles are placed every frame at the simulated time part-way into the next tick,
+                // so they glide instead of stepping at the tick rate
+                this.advanceVehicles(this.simulationTime + this.tickAccumulator / 1000 * this.simulationSpeed);
                 this.updateDisplay();
 
-                if (Math.floor(this.simulationTime) % 60 === 0) {
+                // Update charts on the simulated minute rollover, at most once per wall-clock second
+                const minuteNow = (this.simulationTime / 60) | 0;
+                if (minuteNow !== this.lastChartMinute && timestamp - this.lastChartUpdate >= 1000) {
+                    this.lastChartMinute = minuteNow;
+                    this.lastChartUpdate = timestamp;
                     this.updateCharts();
                 }
 
-                requestAnimationFrame(() => this.simulationStep());
+                requestAnimationFrame((ts) => this.simulationStep(ts));
             } catch (error) {
                 console.error('CRITICAL: Error in simulation step:', error.message || error);
                 this.isPlaying = false;
@@ -553,7 +805,9 @@
         },
 
         startSimulation: function() {
-            this.simulationStep();
+            this.lastFrameTs = null;
+            this.tickAccumulator = 0;
+            requestAnimationFrame((ts) => this.simulationStep(ts));
         },
 
         stopSimulation: function() {
@@ -561,47 +815,154 @@
         },
 
         inspectFacility: function(nodeId) {
+            // The inspector markup is built on first use; after that only the field text changes
+            if (!this.dom.inspectorFields) {
+                this.dom.inspectorContent.innerHTML = `
+                    <h4 id="insp_name"></h4>
+                    <div class="data-row">
+                        <span>Product:</span>
+                        <span id="insp_product"></span>
+                    </div>
+                    <div class="data-row">
+                        <span>Current Stock:</span>
+                        <span><span id="insp_stock"></span> units</span>
+                    </div>
+                    <div class="data-row">
+                        <span>Capacity:</span>
+                        <span><span id="insp_capacity"></span> units</span>
+                    </div>
+                    <div class="data-row">
+                        <span>Stock Level:</span>
+                        <span><span id="insp_level"></span>%</span>
+                    </div>
+                    <div class="data-row">
+                        <span>Inbound Rate:</span>
+                        <span><span id="insp_inbound"></span> units/hour</span>
+                    </div>
+                    <div class="data-row">
+                        <span>Outbound Rate:</span>
+                        <span><span id="insp_outbound"></span> units/hour</span>
+                    </div>
+                    <div class="data-row">
+                        <span>Production Rate:</span>
+                        <span><span id="insp_production"></span> units/hour</span>
+                    </div>
+                    <div class="data-row">
+                        <span>Sales Rate:</span>
+                        <span><span id="insp_sales"></span> units/hour</span>
+                    </div>
+                `;
+                this.dom.inspectorFields = {};
+                ['name', 'product', 'stock', 'capacity', 'level', 'inbound', 'outbound', 'production', 'sales'].forEach(field => {
+                    this.dom.inspectorFields[field] = document.getElementById('insp_' + field);
+                });
+            }
+
             const node = this.nodesData[nodeId];
-            const state = this.nodeState[nodeId];
+            this.inspectedNodeId = nodeId;
+            this.dom.inspectorFields.name.textContent = node.name;
+            this.dom.inspectorFields.product.textContent = node.product;
+            this.refreshInspector();
 
-            document.getElementById('inspectorContent').innerHTML = `
-                <h4>${node.name}</h4>
-                <div class="data-row">
-                    <span>Product:</span>
-                    <span>${node.product}</span>
-                </div>
-                <div class="data-row">
-                    <span>Current Stock:</span>
-                    <span>${Math.round(state.stock)} units</span>
-                </div>
-                <div class="data-row">
-                    <span>Capacity:</span>
-                    <span>${state.capacity} units</span>
-                </div>
-                <div class="data-row">
-                    <span>Stock Level:</span>
-                    <span>${((state.stock / state.capacity) * 100).toFixed(1)}%</span>
-                </div>
-                <div class="data-row">
-                    <span>Inbound Rate:</span>
-                    <span>${Math.round(state.inbound_rate)} units/hour</span>
-                </div>
-                <div class="data-row">
-                    <span>Outbound Rate:</span>
-                    <span>${Math.round(state.outbound_rate)} units/hour</span>
-                </div>
-                <div class="data-row">
-                    <span>Production Rate:</span>
-                    <span>${Math.round(state.production_rate)} units/hour</span>
-                </div>
-                <div class="data-row">
-                    <span>Sales Rate:</span>
-                    <span>${Math.round(state.sales_rate)} units/hour</span>
+            this.dom.inspectorPanel.classList.remove('collapsed');
+            this.dom.inspectorToggle.textContent = '−';
+        },
+
+        refreshInspector: function() {
+            const i = this.nodeIdToIdx[this.inspectedNodeId];
+            const fields = this.dom.inspectorFields;
+            fields.stock.textContent = Math.round(this.stockArr[i]);
+            fields.capacity.textContent = this.capacityArr[i];
+            fields.level.textContent = ((this.stockArr[i] / this.capacityArr[i]) * 100).toFixed(1);
+            fields.inbound.textContent = Math.round(this.inboundRateArr[i]);
+            fields.outbound.textContent = Math.round(this.outboundRateArr[i]);
+            fields.production.textContent = Math.round(this.productionRateArr[i]);
+            fields.sales.textContent = Math.round(this.salesRateArr[i]);
+        },
+
+        addFacilityMarkers: function() {
+            // One GeoJSON layer for all facilities inside a cluster group, so only markers in view
+            // hit the DOM once the network grows; popup HTML is only built when opened
+            const cluster = L.markerClusterGroup({
+                chunkedLoading: true,
+                chunkInterval: 50,
+                disableClusteringAtZoom: 6
+            });
+            cluster.addLayer(L.geoJson({ type: 'FeatureCollection', features: this.facilityFeatures }, {
+                pointToLayer: (feature, latlng) => L.marker(latlng, {
+                    icon: L.AwesomeMarkers.icon({
+                        icon: feature.properties.icon,
+                        iconColor: 'white',
+                        markerColor: feature.properties.icon_color,
+                        prefix: 'fa'
+                    })
+                }).bindPopup(() => this.renderPopup(feature.properties))
+                    .on('click', () => this.inspectFacility(feature.properties.id))
+                    .on('popupopen', () => this.trackPopupStock(feature.properties.id))
+                    .on('popupclose', () => {
+                        delete this.popupStockEls[feature.properties.id];
+                    })
+            }));
+            theMap.addLayer(cluster);
+        },
+
+        trackPopupStock: function(nodeId) {
+            // Look the stock span up once per opening; updateDisplay writes to it directly
+            const element = document.getElementById(`inventory-${nodeId}-stock`);
+            if (element) {
+                this.popupStockEls[nodeId] = element;
+                this.lastStock[nodeId] = Number(element.textContent);
+            }
+        },
+
+        placeVehicle: function(vehicle, i) {
+            // Move a vehicle to the point starting at index i of the flat coordinate column
+            vehicle.latLng.lat = this.routeCoordsFlat[i];
+            vehicle.latLng.lng = this.routeCoordsFlat[i + 1];
+            vehicle.marker.setLatLng(vehicle.latLng);
+        },
+
+        routeLatLngs: function(routeId) {
+            // Nested [[lat, lng], ...] path for Leaflet layers that need one
+            const offsets = this.routeOffsets[routeId];
+            const latLngs = [];
+            for (let i = offsets[0]; i < offsets[1]; i += 2) {
+                latLngs.push([this.routeCoordsFlat[i], this.routeCoordsFlat[i + 1]]);
+            }
+            return latLngs;
+        },
+
+        addRoutePaths: function() {
+            const routeColors = { truck: 'blue', rail: 'green', air: 'red', multimodal: 'purple' };
+
+            // Draw every route in one loop instead of one Folium AntPath object per route
+            Object.keys(this.routeOffsets).forEach(routeId => {
+                const coords = this.routeLatLngs(routeId);
+                const mode = this.routesData[routeId].mode || 'truck';
+                L.polyline.antPath(coords, {
+                    color: routeColors[mode] || 'blue',
+                    weight: 4,
+                    opacity: 0.7,
+                    dashArray: mode === 'rail' ? [15, 30] : [10, 20],
+                    pulseColor: '#ffffff',
+                    delay: 1000
+                }).addTo(theMap);
+            });
+        },
+
+        renderPopup: function(facility) {
+            const state = this.getNodeState(facility.id);
+            const stock = Math.round(state.stock);
+            this.lastStock[facility.id] = stock;
+            return `
+                <div style="width: 200px;">
+                    <h4>${facility.name}</h4>
+                    <p><strong>Product:</strong> ${facility.product}</p>
+                    <p><strong>Type:</strong> ${facility.type}</p>
+                    <p><strong>Capacity:</strong> ${facility.capacity} units</p>
+                    <div id="inventory-${facility.id}"><strong>Stock:</strong> <span id="inventory-${facility.id}-stock">${stock}</span>/${state.capacity} units</div>
                 </div>
             `;
-
-            document.getElementById('inspectorPanel').classList.remove('collapsed');
-            document.querySelector('#inspectorPanel .panel-toggle').textContent = '−';
         }
     };
     
@@ -4,278 +4,476 @@ IKEA Supply Chain Simulation - Level 4 Interactive Simulation
 Features: Real-world physics, live data tracking, user interactivity
 """
 
-import folium
-import folium.plugins as plugins
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import functools
+import gzip
+import hashlib
 import math
+import numpy as np
 import http.server
-import socketserver
+from jinja2 import Environment, FileSystemLoader
 import webbrowser
 import threading
 import os
+import re
+import socket
 import time
 
-def get_osrm_route(start_coords, end_coords, profile='driving'):
+# Shared HTTP session so concurrent OSRM requests reuse keep-alive connections,
+# retrying transient gateway errors before falling back to a straight line
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(
+    pool_connections=16, pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504))))
+
+# The page skeleton is rendered from templates/ in one Jinja2 pass
+TEMPLATE_ENV = Environment(loader=FileSystemLoader(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')))
+
+# Decoded OSRM geometries are cached here; delete the folder to invalidate
+OSRM_CACHE_DIR = '.osrm_cache'
+
+def decode_polyline(encoded, precision=5):
+    """Decode a Google encoded polyline string into [lat, lon] pairs"""
+    coords = []
+    factor = 10 ** precision
+    index = lat = lon = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        coords.append([lat / factor, lon / factor])
+    return coords
+
+# Query options sent with every OSRM route request
+OSRM_QUERY = 'overview=simplified&geometries=polyline6'
+
+def osrm_route_url(start_coords, end_coords, profile='driving', query=OSRM_QUERY):
+    """Build the OSRM route URL for a start/end pair of [lat, lon] coordinates"""
+    return (f"http://router.project-osrm.org/route/v1/{profile}/"
+            f"{start_coords[1]},{start_coords[0]};{end_coords[1]},{end_coords[0]}?{query}")
+
+def get_osrm_route(session, url):
     """Get route from OSRM API"""
     try:
-        url = f"http://router.project-osrm.org/route/v1/{profile}/{start_coords[1]},{start_coords[0]};{end_coords[1]},{end_coords[0]}?overview=full&geometries=geojson"
-        response = requests.get(url, timeout=10)
+        response = session.get(url, timeout=(2, 8))
         if response.status_code == 200:
             data = response.json()
             if data['routes']:
-                # OSRM returns [lon, lat], but we need [lat, lon] for Folium
-                coords = data['routes'][0]['geometry']['coordinates']
-                return [[coord[1], coord[0]] for coord in coords]
+                # Encoded polylines are already in [lat, lon] order
+                precision = 6 if 'geometries=polyline6' in url else 5
+                return decode_polyline(data['routes'][0]['geometry'], precision=precision)
     except Exception as e:
         print(f"OSRM API error: {e}")
     return None
 
-def create_ikea_simulation():
-    """Create the comprehensive IKEA supply chain simulation"""
-
-    # Initialize the map centered on Europe
-    m = folium.Map(location=[52.0, 15.0], zoom_start=4,
-                   tiles='cartodbpositron',
-                   control_scale=True)
-
-    # CAPTURE MAP ID FOR RELIABLE JAVASCRIPT REFERENCE
-    map_id = m.get_name()
-
-    # Define all strategic nodes
-    nodes = {
-        'N1_SWE': {
-            'name': 'Småland Forests, Sweden',
-            'coords': [57.75, 14.50],
-            'type': 'raw_materials',
-            'icon': 'tree',
-            'product': 'Pine Timber',
-            'capacity': 10000,
-            'initial_stock': 5000
-        },
-        'N2_ROM': {
-            'name': 'Brasov, Romania',
-            'coords': [45.65, 25.60],
-            'type': 'raw_materials',
-            'icon': 'tree',
-            'product': 'Pine Timber',
-            'capacity': 8000,
-            'initial_stock': 4000
-        },
-        'N3_DE': {
-            'name': 'BASF Ludwigshafen, Germany',
-            'coords': [49.48, 8.44],
-            'type': 'raw_materials',
-            'icon': 'flask',
-            'product': 'Glue/Resin',
-            'capacity': 5000,
-            'initial_stock': 2500
-        },
-        'N4_CN': {
-            'name': 'Shenzhen Supplier, China',
-            'coords': [22.54, 114.05],
-            'type': 'raw_materials',
-            'icon': 'cogs',
-            'product': 'Metal Fittings',
-            'capacity': 12000,
-            'initial_stock': 6000
-        },
-        'N5_FAC': {
-            'name': 'IKEA Industry Zbąszynek, Poland',
-            'coords': [52.24, 15.91],
-            'type': 'manufacturing',
-            'icon': 'industry',
-            'product': 'Billy Bookshelf Assembly',
-            'capacity': 15000,
-            'initial_stock': 2000
-        },
-        'N6_DC': {
-            'name': 'IKEA DC Dortmund, Germany',
-            'coords': [51.51, 7.46],
-            'type': 'distribution',
-            'icon': 'warehouse',
-            'product': 'Distribution Hub',
-            'capacity': 20000,
-            'initial_stock': 5000
-        },
-        'N7_UK': {
-            'name': 'IKEA Wembley, UK',
-            'coords': [51.55, -0.27],
-            'type': 'retail',
-            'icon': 'shopping-cart',
-            'product': 'Retail Store',
-            'capacity': 3000,
-            'initial_stock': 500
-        },
-        'N8_US': {
-            'name': 'IKEA Brooklyn, USA',
-            'coords': [40.67, -74.01],
-            'type': 'retail',
-            'icon': 'shopping-cart',
-            'product': 'Retail Store',
-            'capacity': 3000,
-            'initial_stock': 500
-        },
-        'N9_FR': {
-            'name': 'IKEA Paris Nord, France',
-            'coords': [48.98, 2.49],
-            'type': 'retail',
-            'icon': 'shopping-cart',
-            'product': 'Retail Store',
-            'capacity': 3000,
-            'initial_stock': 500
-        },
-        'N10_IT': {
-            'name': 'IKEA Milan, Italy',
-            'coords': [45.54, 9.20],
-            'type': 'retail',
-            'icon': 'shopping-cart',
-            'product': 'Retail Store',
-            'capacity': 3000,
-            'initial_stock': 500
-        }
+def simplify_route(coords, tolerance=0.005):
+    """Simplify a [lat, lon] polyline with the Ramer-Douglas-Peucker algorithm"""
+    if len(coords) < 3:
+        return [list(coord) for coord in coords]
+
+    keep = [False] * len(coords)
+    keep[0] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+    stack = [(0, len(coords) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = coords[first]
+        dx, dy = coords[last][0] - ax, coords[last][1] - ay
+        seg_len_sq = dx * dx + dy * dy
+
+        # Find the point furthest from the segment between first and last
+        max_dist_sq, index = 0.0, None
+        for i in range(first + 1, last):
+            px, py = coords[i][0] - ax, coords[i][1] - ay
+            t = 0.0 if seg_len_sq == 0 else max(0.0, min(1.0, (px * dx + py * dy) / seg_len_sq))
+            dist_sq = (px - t * dx) ** 2 + (py - t * dy) ** 2
+            if dist_sq > max_dist_sq:
+                max_dist_sq, index = dist_sq, i
+
+        if index is not None and max_dist_sq > tolerance_sq:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [list(coord) for coord, kept in zip(coords, keep) if kept]
+
+def thin_route(coords, n_max=64, tolerance=0.005):
+    """Simplify a polyline and cap it at n_max points, always keeping both endpoints"""
+    if n_max < 2:
+        raise ValueError(f"n_max must be at least 2 to keep both endpoints, got {n_max}")
+    coords = simplify_route(coords, tolerance)
+    if len(coords) <= n_max:
+        return coords
+    # Uniform decimation over whatever RDP left behind
+    step = (len(coords) - 1) / (n_max - 1)
+    return [coords[round(i * step)] for i in range(n_max)]
+
+def to_json(obj):
+    """Serialize obj as compact JSON for inlining into the generated page"""
+    return json.dumps(obj, separators=(',', ':'))
+
+def write_if_changed(path, text):
+    """Write text to path unless the file already holds exactly that content"""
+    data = text.encode('utf-8')
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            if hashlib.blake2b(f.read()).digest() == hashlib.blake2b(data).digest():
+                return False
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+def minify_css(css):
+    """Strip comments and collapse whitespace in a CSS string"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    return css.replace(': ', ':').replace(';}', '}').strip()
+
+def haversine_km(start, end):
+    """Great-circle distances in km between two (N, 2) arrays of [lat, lon] degrees"""
+    start = np.radians(np.asarray(start, dtype=float))
+    end = np.radians(np.asarray(end, dtype=float))
+    dlat = end[:, 0] - start[:, 0]
+    dlon = end[:, 1] - start[:, 1]
+    a = np.sin(dlat / 2) ** 2 + np.cos(start[:, 0]) * np.cos(end[:, 0]) * np.sin(dlon / 2) ** 2
+    return 2 * 6371 * np.arcsin(np.sqrt(a))
+
+def route_distance_km(coords):
+    """Total great-circle length of a [lat, lon] polyline in km"""
+    arr = np.asarray(coords, dtype=float)
+    return float(haversine_km(arr[:-1], arr[1:]).sum())
+
+def endpoint_distances_km(routes, nodes):
+    """Direct origin-to-destination distance of every route in km, in routes order"""
+    start = [nodes[route_data['from']]['coords'] for route_data in routes.values()]
+    end = [nodes[route_data['to']]['coords'] for route_data in routes.values()]
+    return haversine_km(start, end)
+
+def build_route_table(routes):
+    """Pack the numeric route fields into a NumPy structured array, one column per field"""
+    fields = ('distance_km', 'capacity', 'speed', 'emission')
+    table = np.empty(len(routes), dtype=[(field, 'f8') for field in fields])
+    for field in fields:
+        table[field] = np.fromiter((route_data[field] for route_data in routes.values()),
+                                   dtype='f8', count=len(routes))
+    return table
+
+def get_cached_osrm_route(session, start_coords, end_coords, profile='driving'):
+    """Get route from OSRM API, reusing responses cached in memory and on disk"""
+    return _cached_osrm_route(session, osrm_route_url(start_coords, end_coords, profile))
+
+@functools.lru_cache(maxsize=None)
+def _cached_osrm_route(session, url):
+    # Keyed on the full URL so changing the query options never serves stale geometry
+    key = hashlib.blake2b(url.encode()).hexdigest()
+    cache_file = os.path.join(OSRM_CACHE_DIR, f"{key}.json")
+    if os.path.exists(cache_file):
+        with open(cache_file) as f:
+            return json.load(f)
+
+    coords = get_osrm_route(session, url)
+    if coords:
+        os.makedirs(OSRM_CACHE_DIR, exist_ok=True)
+        with open(cache_file, 'w') as f:
+            json.dump(coords, f)
+    return coords
+
+# Define all strategic nodes
+NODES = {
+    'N1_SWE': {
+        'name': 'Småland Forests, Sweden',
+        'coords': [57.75, 14.50],
+        'type': 'raw_materials',
+        'icon': 'tree',
+        'product': 'Pine Timber',
+        'capacity': 10000,
+        'initial_stock': 5000
+    },
+    'N2_ROM': {
+        'name': 'Brasov, Romania',
+        'coords': [45.65, 25.60],
+        'type': 'raw_materials',
+        'icon': 'tree',
+        'product': 'Pine Timber',
+        'capacity': 8000,
+        'initial_stock': 4000
+    },
+    'N3_DE': {
+        'name': 'BASF Ludwigshafen, Germany',
+        'coords': [49.48, 8.44],
+        'type': 'raw_materials',
+        'icon': 'flask',
+        'product': 'Glue/Resin',
+        'capacity': 5000,
+        'initial_stock': 2500
+    },
+    'N4_CN': {
+        'name': 'Shenzhen Supplier, China',
+        'coords': [22.54, 114.05],
+        'type': 'raw_materials',
+        'icon': 'cogs',
+        'product': 'Metal Fittings',
+        'capacity': 12000,
+        'initial_stock': 6000
+    },
+    'N5_FAC': {
+        'name': 'IKEA Industry Zbąszynek, Poland',
+        'coords': [52.24, 15.91],
+        'type': 'manufacturing',
+        'icon': 'industry',
+        'product': 'Billy Bookshelf Assembly',
+        'capacity': 15000,
+        'initial_stock': 2000
+    },
+    'N6_DC': {
+        'name': 'IKEA DC Dortmund, Germany',
+        'coords': [51.51, 7.46],
+        'type': 'distribution',
+        'icon': 'warehouse',
+        'product': 'Distribution Hub',
+        'capacity': 20000,
+        'initial_stock': 5000
+    },
+    'N7_UK': {
+        'name': 'IKEA Wembley, UK',
+        'coords': [51.55, -0.27],
+        'type': 'retail',
+        'icon': 'shopping-cart',
+        'product': 'Retail Store',
+        'capacity': 3000,
+        'initial_stock': 500
+    },
+    'N8_US': {
+        'name': 'IKEA Brooklyn, USA',
+        'coords': [40.67, -74.01],
+        'type': 'retail',
+        'icon': 'shopping-cart',
+        'product': 'Retail Store',
+        'capacity': 3000,
+        'initial_stock': 500
+    },
+    'N9_FR': {
+        'name': 'IKEA Paris Nord, France',
+        'coords': [48.98, 2.49],
+        'type': 'retail',
+        'icon': 'shopping-cart',
+        'product': 'Retail Store',
+        'capacity': 3000,
+        'initial_stock': 500
+    },
+    'N10_IT': {
+        'name': 'IKEA Milan, Italy',
+        'coords': [45.54, 9.20],
+        'type': 'retail',
+        'icon': 'shopping-cart',
+        'product': 'Retail Store',
+        'capacity': 3000,
+        'initial_stock': 500
     }
-
-    # Define transportation routes and their properties
-    routes = {
-        'china_poland': {
-            'from': 'N4_CN',
-            'to': 'N5_FAC',
-            'mode': 'rail',
-            'waypoints': [
-                [22.54, 114.05],  # Shenzhen
-                [34.34, 108.93],  # Xian
-                [43.82, 87.61],   # Urumqi
-                [43.22, 76.85],   # Almaty
-                [55.76, 37.62],   # Moscow
-                [53.90, 27.56],   # Minsk
-                [52.24, 15.91]    # Zbąszynek
-            ],
-            'vehicle': 'train',
-            'capacity': 26650,
-            'speed': 45,  # km/h
-            'emission': 0.022,  # kg/tkm
-            'frequency': 7  # days
-        },
-        'sweden_poland': {
-            'from': 'N1_SWE',
-            'to': 'N5_FAC',
-            'mode': 'multimodal',
-            'vehicle': 'truck',
-            'capacity': 600,
-            'speed': 80,
-            'emission': 0.057,
-            'frequency': 2
-        },
-        'romania_poland': {
-            'from': 'N2_ROM',
-            'to': 'N5_FAC',
-            'mode': 'truck',
-            'vehicle': 'truck',
-            'capacity': 600,
-            'speed': 80,
-            'emission': 0.057,
-            'frequency': 3
-        },
-        'germany_poland': {
-            'from': 'N3_DE',
-            'to': 'N5_FAC',
-            'mode': 'truck',
-            'vehicle': 'truck',
-            'capacity': 600,
-            'speed': 80,
-            'emission': 0.057,
-            'frequency': 4
-        },
-        'poland_germany': {
-            'from': 'N5_FAC',
-            'to': 'N6_DC',
-            'mode': 'truck',
-            'vehicle': 'truck',
-            'capacity': 600,
-            'speed': 80,
-            'emission': 0.057,
-            'frequency': 1
-        },
-        'germany_uk': {
-            'from': 'N6_DC',
-            'to': 'N7_UK',
-            'mode': 'truck',
-            'vehicle': 'truck',
-            'capacity': 600,
-            'speed': 80,
-            'emission': 0.057,
-            'frequency': 2
-        },
-        'germany_france': {
-            'from': 'N6_DC',
-            'to': 'N9_FR',
-            'mode': 'truck',
-            'vehicle': 'truck',
-            'capacity': 600,
-            'speed': 80,
-            'emission': 0.057,
-            'frequency': 2
-        },
-        'germany_italy': {
-            'from': 'N6_DC',
-            'to': 'N10_IT',
-            'mode': 'truck',
-            'vehicle': 'truck',
-            'capacity': 600,
-            'speed': 80,
-            'emission': 0.057,
-            'frequency': 3
-        },
-        'germany_usa': {
-            'from': 'N6_DC',
-            'to': 'N8_US',
-            'mode': 'air',
-            'vehicle': 'plane',
-            'capacity': 2550,
-            'speed': 900,
-            'emission': 0.500,
-            'frequency': 7
-        }
+}
+
+# Define transportation routes and their properties
+ROUTES = {
+    'china_poland': {
+        'from': 'N4_CN',
+        'to': 'N5_FAC',
+        'mode': 'rail',
+        'waypoints': [
+            [22.54, 114.05],  # Shenzhen
+            [34.34, 108.93],  # Xian
+            [43.82, 87.61],   # Urumqi
+            [43.22, 76.85],   # Almaty
+            [55.76, 37.62],   # Moscow
+            [53.90, 27.56],   # Minsk
+            [52.24, 15.91]    # Zbąszynek
+        ],
+        'vehicle': 'train',
+        'capacity': 26650,
+        'speed': 45,  # km/h
+        'emission': 0.022,  # kg/tkm
+        'frequency': 7  # days
+    },
+    'sweden_poland': {
+        'from': 'N1_SWE',
+        'to': 'N5_FAC',
+        'mode': 'multimodal',
+        'vehicle': 'truck',
+        'capacity': 600,
+        'speed': 80,
+        'emission': 0.057,
+        'frequency': 2
+    },
+    'romania_poland': {
+        'from': 'N2_ROM',
+        'to': 'N5_FAC',
+        'mode': 'truck',
+        'vehicle': 'truck',
+        'capacity': 600,
+        'speed': 80,
+        'emission': 0.057,
+        'frequency': 3
+    },
+    'germany_poland': {
+        'from': 'N3_DE',
+        'to': 'N5_FAC',
+        'mode': 'truck',
+        'vehicle': 'truck',
+        'capacity': 600,
+        'speed': 80,
+        'emission': 0.057,
+        'frequency': 4
+    },
+    'poland_germany': {
+        'from': 'N5_FAC',
+        'to': 'N6_DC',
+        'mode': 'truck',
+        'vehicle': 'truck',
+        'capacity': 600,
+        'speed': 80,
+        'emission': 0.057,
+        'frequency': 1
+    },
+    'germany_uk': {
+        'from': 'N6_DC',
+        'to': 'N7_UK',
+        'mode': 'truck',
+        'vehicle': 'truck',
+        'capacity': 600,
+        'speed': 80,
+        'emission': 0.057,
+        'frequency': 2
+    },
+    'germany_france': {
+        'from': 'N6_DC',
+        'to': 'N9_FR',
+        'mode': 'truck',
+        'vehicle': 'truck',
+        'capacity': 600,
+        'speed': 80,
+        'emission': 0.057,
+        'frequency': 2
+    },
+    'germany_italy': {
+        'from': 'N6_DC',
+        'to': 'N10_IT',
+        'mode': 'truck',
+        'vehicle': 'truck',
+        'capacity': 600,
+        'speed': 80,
+        'emission': 0.057,
+        'frequency': 3
+    },
+    'germany_usa': {
+        'from': 'N6_DC',
+        'to': 'N8_US',
+        'mode': 'air',
+        'vehicle': 'plane',
+        'capacity': 2550,
+        'speed': 900,
+        'emission': 0.500,
+        'frequency': 7
+    }
+}
+
+# Pre-fetched road route geometry shipped with the repo, rebuild with build_routes.py
+ROUTES_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'routes_cache.json')
+
+def fetch_road_routes():
+    """Fetch simplified OSRM geometry for every road route concurrently"""
+    road_routes = [
+        (route_id, NODES[route_data['from']]['coords'], NODES[route_data['to']]['coords'])
+        for route_id, route_data in ROUTES.items()
+        if route_data['mode'] != 'air' and 'waypoints' not in route_data
+    ]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        osrm_routes = dict(zip(
+            [route_id for route_id, _, _ in road_routes],
+            executor.map(lambda args: get_cached_osrm_route(SESSION, args[1], args[2]), road_routes)
+        ))
+
+    # Drop vertices that are invisible at map zoom to shrink the HTML
+    return {
+        route_id: simplify_route(coords) if coords and len(coords) >= 2 else None
+        for route_id, coords in osrm_routes.items()
     }
 
-    # Add markers for all nodes
-    for node_id, node_data in nodes.items():
-        icon_color = {
-            'raw_materials': 'green',
-            'manufacturing': 'blue',
-            'distribution': 'orange',
-            'retail': 'red'
-        }[node_data['type']]
-
-        icon_type = {
-            'tree': 'tree',
-            'flask': 'flask',
-            'cogs': 'cogs',
-            'industry': 'industry',
-            'warehouse': 'warehouse',
-            'shopping-cart': 'shopping-cart'
-        }[node_data['icon']]
-
-        folium.Marker(
-            location=node_data['coords'],
-            popup=f"""
-            <div style="width: 200px;">
-                <h4>{node_data['name']}</h4>
-                <p><strong>Product:</strong> {node_data['product']}</p>
-                <p><strong>Type:</strong> {node_data['type'].title()}</p>
-                <p><strong>Capacity:</strong> {node_data['capacity']} units</p>
-                <div id="inventory-{node_id}">Loading...</div>
-            </div>
-            """,
-            icon=folium.Icon(color=icon_color, icon=icon_type, prefix='fa')
-        ).add_to(m)
+def load_road_routes():
+    """Load road route geometry from the cache file, fetching it from OSRM if missing"""
+    if os.path.exists(ROUTES_CACHE_FILE):
+        with open(ROUTES_CACHE_FILE) as f:
+            return json.load(f)
+
+    road_routes = fetch_road_routes()
+    # Only persist a complete set so failed routes are retried on the next run
+    if all(road_routes.values()):
+        with open(ROUTES_CACHE_FILE, 'w') as f:
+            json.dump(road_routes, f)
+    return road_routes
+
+# Facility marker styling by node type and icon name
+ICON_COLOR = {
+    'raw_materials': 'green',
+    'manufacturing': 'blue',
+    'distribution': 'orange',
+    'retail': 'red'
+}
+
+ICON_TYPE = {
+    'tree': 'tree',
+    'flask': 'flask',
+    'cogs': 'cogs',
+    'industry': 'industry',
+    'warehouse': 'warehouse',
+    'shopping-cart': 'shopping-cart'
+}
+
+# Production rate factors each what-if scenario applies, by node
+# (green_rail's reduced Romania outbound is not modelled yet)
+SCENARIO_PRODUCTION = {
+    'baseline': {},
+    'green_rail': {},
+    'local_source': {'N1_SWE': 0, 'N5_FAC': 1.5}
+}
+
+# Demand seasonality by month: New Year 1.3x, summer slump 0.8x, back-to-school 1.8x
+SEASONALITY = [1.3, 1.0, 1.0, 1.0, 1.0, 0.8, 0.8, 1.8, 1.8, 1.0, 1.0, 1.0]
+
+def scenario_appliers_js(node_ids):
+    """Emit one specialized JS function per scenario with the node indices baked in"""
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    entries = []
+    for scenario, factors in SCENARIO_PRODUCTION.items():
+        lines = [
+            f"this.productionRateArr[{index[node_id]}] *= {factor}; // {node_id}"
+            for node_id, factor in factors.items()
+        ]
+        body = ''.join(f"\n                {line}" for line in lines)
+        entries.append(f"{scenario}: function() {{{body}\n            }}")
+    return '{\n            ' + ',\n            '.join(entries) + '\n        }'
+
+def measure_routes(routes, nodes):
+    """Label each route with distance_km/segment_km and return its thinned [lat, lon] path"""
+    # Road route geometry comes from the shipped cache rather than live OSRM calls
+    road_routes = load_road_routes()
 
-    # Store route coordinates for JavaScript moving markers
     route_coordinates = {}
-
-    # Calculate and add routes
     for route_id, route_data in routes.items():
         from_node = nodes[route_data['from']]
         to_node = nodes[route_data['to']]
@@ -287,762 +485,99 @@ def create_ikea_simulation():
             # Use predefined waypoints for China->Poland rail
             route_coords = route_data['waypoints']
         else:
-            # Use OSRM for road routes
-            route_coords = get_osrm_route(from_node['coords'], to_node['coords'])
-            if not route_coords or len(route_coords) < 2:
+            # Use the cached OSRM geometry for road routes
+            route_coords = road_routes.get(route_id)
+            if not route_coords:
                 # Fallback to straight line if OSRM fails
                 print(f"OSRM failed for {route_id}, using straight line")
                 route_coords = [from_node['coords'], to_node['coords']]
 
-        # Store coordinates for JavaScript
-        route_coordinates[route_id] = route_coords
-
-        # Add AntPath for route visualization
-        plugins.AntPath(
-            locations=route_coords,
-            color={
-                'truck': 'blue',
-                'rail': 'green',
-                'air': 'red',
-                'multimodal': 'purple'
-            }.get(route_data.get('mode', 'truck'), 'blue'),
-            weight=4,
-            opacity=0.7,
-            dash_array=[15, 30] if route_data.get('mode') == 'rail' else [10, 20],
-            pulse_color='#ffffff',
-            delay=1000
-        ).add_to(m)
-
-    # Create the HTML template with JavaScript
-    html_template = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>IKEA Supply Chain Simulation</title>
-        <meta charset="utf-8" />
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <link rel="stylesheet" href="https://unpkg.com/leaflet@1.7.1/dist/leaflet.css" />
-        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-        <script src="https://unpkg.com/leaflet@1.7.1/dist/leaflet.js"></script>
-        <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-        <script src="https://unpkg.com/leaflet-moving-marker@0.0.1/dist/leaflet.moving-marker.min.js"></script>
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>IKEA Supply Chain Simulation</title>
-        <meta charset="utf-8" />
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <link rel="stylesheet" href="https://unpkg.com/leaflet@1.7.1/dist/leaflet.css" />
-        <style>
-            body {{
-                margin: 0;
-                padding: 0;
-                font-family: Arial, sans-serif;
-                overflow: hidden;
-            }}
-            #map {{
-                height: 100vh;
-                width: 100%;
-            }}
-            .control-panel {{
-                position: absolute;
-                top: 10px;
-                left: 10px;
-                background: white;
-                padding: 15px;
-                border-radius: 8px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                z-index: 1000;
-                min-width: 250px;
-            }}
-            .control-panel.collapsed {{
-                height: 40px;
-                overflow: hidden;
-            }}
-            .panel-header {{
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                margin-bottom: 10px;
-                cursor: pointer;
-            }}
-            .panel-toggle {{
-                background: none;
-                border: none;
-                font-size: 16px;
-                cursor: pointer;
-            }}
-            .control-buttons {{
-                display: flex;
-                gap: 10px;
-                margin-bottom: 10px;
-            }}
-            .speed-slider {{
-                width: 100%;
-                margin-bottom: 10px;
-            }}
-            .scenario-selector {{
-                width: 100%;
-                padding: 5px;
-                margin-bottom: 10px;
-            }}
-            .inspector-panel {{
-                position: absolute;
-                top: 10px;
-                right: 10px;
-                background: white;
-                padding: 15px;
-                border-radius: 8px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                z-index: 1000;
-                min-width: 300px;
-                max-height: 80vh;
-                overflow-y: auto;
-            }}
-            .inspector-panel.collapsed {{
-                height: 40px;
-                overflow: hidden;
-            }}
-            .charts-panel {{
-                position: absolute;
-                bottom: 10px;
-                left: 10px;
-                background: white;
-                padding: 15px;
-                border-radius: 8px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                z-index: 1000;
-                width: 600px;
-                height: 300px;
-            }}
-            .charts-panel.collapsed {{
-                height: 40px;
-                overflow: hidden;
-            }}
-            .chart-container {{
-                height: 250px;
-                margin-bottom: 20px;
-            }}
-            .legend-panel {{
-                position: absolute;
-                bottom: 10px;
-                right: 10px;
-                background: white;
-                padding: 15px;
-                border-radius: 8px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                z-index: 1000;
-            }}
-            .legend-item {{
-                display: flex;
-                align-items: center;
-                margin-bottom: 5px;
-            }}
-            .legend-color {{
-                width: 20px;
-                height: 20px;
-                margin-right: 10px;
-                border-radius: 3px;
-            }}
-            button {{
-                padding: 8px 12px;
-                border: none;
-                border-radius: 4px;
-                cursor: pointer;
-                background: #007cba;
-                color: white;
-            }}
-            button:hover {{
-                background: #005a87;
-            }}
-            button.pause {{
-                background: #dc3545;
-            }}
-            button.pause:hover {{
-                background: #c82333;
-            }}
-            .data-display {{
-                margin-top: 10px;
-            }}
-            .data-row {{
-                display: flex;
-                justify-content: space-between;
-                margin-bottom: 5px;
-            }}
-            .vehicle-icon {{
-                background: transparent !important;
-                border: none !important;
-                box-shadow: none !important;
-            }}
-            .vehicle-icon div {{
-                text-shadow: 1px 1px 2px rgba(0,0,0,0.5);
-                line-height: 1;
-            }}
-        </style>
-    </head>
-    <body>
-        <div id="map"></div>
-
-        <!-- Control Panel -->
-        <div class="control-panel" id="controlPanel">
-            <div class="panel-header" onclick="togglePanel('controlPanel')">
-                <h3>Simulation Controls</h3>
-                <button class="panel-toggle">−</button>
-            </div>
-            <div class="control-buttons">
-                <button id="playPauseBtn" onclick="toggleSimulation()">Play</button>
-                <button onclick="resetSimulation()">Reset</button>
-            </div>
-            <div>
-                <label>Speed: <span id="speedValue">1x</span></label>
-                <input type="range" id="speedSlider" class="speed-slider" min="0.1" max="10" step="0.1" value="1">
-            </div>
-            <select id="scenarioSelector" class="scenario-selector">
-                <option value="baseline">Baseline (Current Ops)</option>
-                <option value="green_rail">Green Rail (Shift Romania Trucks to Rail)</option>
-                <option value="local_source">Local Source (Cancel Sweden, source all wood in Poland)</option>
-            </select>
-            <div class="data-display">
-                <div class="data-row">
-                    <span>Current Date:</span>
-                    <span id="currentDate">Jan 1, 2024</span>
-                </div>
-                <div class="data-row">
-                    <span>Simulation Time:</span>
-                    <span id="simTime">00:00:00</span>
-                </div>
-                <div class="data-row">
-                    <span>Season Multiplier:</span>
-                    <span id="seasonMultiplier">1.0x</span>
-                </div>
-            </div>
-        </div>
+        # Pre-label routes with distance so the browser doesn't recompute it
+        route_data['distance_km'] = route_distance_km(route_coords)
 
-        <!-- Inspector Panel -->
-        <div class="inspector-panel collapsed" id="inspectorPanel">
-            <div class="panel-header" onclick="togglePanel('inspectorPanel')">
-                <h3>Facility Inspector</h3>
-                <button class="panel-toggle">+</button>
-            </div>
-            <div id="inspectorContent">
-                <p>Click on a facility marker to inspect</p>
-            </div>
-        </div>
+        # Store coordinates for JavaScript, thinned so every path stays cheap to draw
+        route_coordinates[route_id] = thin_route(route_coords)
 
-        <!-- Charts Panel -->
-        <div class="charts-panel" id="chartsPanel">
-            <div class="panel-header" onclick="togglePanel('chartsPanel')">
-                <h3>Analytics Dashboard</h3>
-                <button class="panel-toggle">−</button>
-            </div>
-            <div class="chart-container">
-                <canvas id="co2Chart"></canvas>
-            </div>
-            <div class="chart-container">
-                <canvas id="scenarioChart"></canvas>
-            </div>
-        </div>
+        # Length of each drawn segment, used to pace the moving markers
+        path = np.asarray(route_coordinates[route_id], dtype=float)
+        route_data['segment_km'] = np.round(haversine_km(path[:-1], path[1:]), 3).tolist()
 
-        <!-- Legend Panel -->
-        <div class="legend-panel">
-            <h4>Legend</h4>
-            <div class="legend-item">
-                <div class="legend-color" style="background: blue;"></div>
-                <span>Truck Routes</span>
-            </div>
-            <div class="legend-item">
-                <div class="legend-color" style="background: green;"></div>
-                <span>Rail Routes</span>
-            </div>
-            <div class="legend-item">
-                <div class="legend-color" style="background: red;"></div>
-                <span>Air Routes</span>
-            </div>
-            <div class="legend-item">
-                <div class="legend-color" style="background: purple;"></div>
-                <span>Multimodal Routes</span>
-            </div>
-        </div>
+    return route_coordinates
 
-        <script>
-            // Global state variables
-            let isPlaying = false;
-            let simulationSpeed = 1;
-            let currentScenario = 'baseline';
-            let startDate = new Date('2024-01-01T00:00:00');
-            let currentDate = new Date(startDate);
-            let simulationTime = 0; // seconds
-            let animationId = null;
-
-            // Node state tracking
-            const nodeState = {json.dumps({node_id: {
-                'stock': node_data['initial_stock'],
-                'capacity': node_data['capacity'],
-                'inbound_rate': 0,
-                'outbound_rate': 0,
-                'production_rate': 50 if node_data['type'] == 'manufacturing' else 0,
-                'sales_rate': 20 if node_data['type'] == 'retail' else 0
-            } for node_id, node_data in nodes.items()}, indent=2)};
-
-            // Transportation vehicles in transit
-            const activeVehicles = [];
-
-            // CO2 tracking
-            const co2Data = {{
-                baseline: {{ truck: 0, rail: 0, air: 0 }},
-                green_rail: {{ truck: 0, rail: 0, air: 0 }},
-                local_source: {{ truck: 0, rail: 0, air: 0 }}
-            }};
-
-            // Scenario comparison data
-            const scenarioComparison = {{
-                baseline: [],
-                green_rail: [],
-                local_source: []
-            }};
-
-            // Routes data
-            const routesData = {json.dumps(routes, indent=2)};
-            const nodesData = {json.dumps(nodes, indent=2)};
-
-            // Chart instances
-            let co2Chart;
-            let scenarioChart;
-
-            // Initialize charts
-            function initCharts() {{
-                const co2Ctx = document.getElementById('co2Chart').getContext('2d');
-                co2Chart = new Chart(co2Ctx, {{
-                    type: 'bar',
-                    data: {{
-                        labels: ['Truck', 'Rail', 'Air'],
-                        datasets: [{{
-                            label: 'CO2 Emissions (kg)',
-                            data: [0, 0, 0],
-                            backgroundColor: ['blue', 'green', 'red']
-                        }}]
-                    }},
-                    options: {{
-                        responsive: true,
-                        maintainAspectRatio: false,
-                        scales: {{
-                            y: {{
-                                beginAtZero: true
-                            }}
-                        }}
-                    }}
-                }});
-
-                const scenarioCtx = document.getElementById('scenarioChart').getContext('2d');
-                scenarioChart = new Chart(scenarioCtx, {{
-                    type: 'line',
-                    data: {{
-                        labels: [],
-                        datasets: [
-                            {{
-                                label: 'Baseline',
-                                data: [],
-                                borderColor: 'blue',
-                                fill: false
-                            }},
-                            {{
-                                label: 'Green Rail',
-                                data: [],
-                                borderColor: 'green',
-                                fill: false
-                            }},
-                            {{
-                                label: 'Local Source',
-                                data: [],
-                                borderColor: 'orange',
-                                fill: false
-                            }}
-                        ]
-                    }},
-                    options: {{
-                        responsive: true,
-                        maintainAspectRatio: false,
-                        scales: {{
-                            x: {{
-                                display: true,
-                                title: {{
-                                    display: true,
-                                    text: 'Time (Days)'
-                                }}
-                            }},
-                            y: {{
-                                display: true,
-                                title: {{
-                                    display: true,
-                                    text: 'Cumulative CO2 (kg)'
-                                }}
-                            }}
-                        }}
-                    }}
-                }});
-            }}
-
-            // Toggle panel visibility
-            function togglePanel(panelId) {{
-                const panel = document.getElementById(panelId);
-                const toggleBtn = panel.querySelector('.panel-toggle');
-
-                if (panel.classList.contains('collapsed')) {{
-                    panel.classList.remove('collapsed');
-                    toggleBtn.textContent = '−';
-                }} else {{
-                    panel.classList.add('collapsed');
-                    toggleBtn.textContent = '+';
-                }}
-            }}
-
-            // Toggle simulation play/pause
-            function toggleSimulation() {{
-                isPlaying = !isPlaying;
-                const btn = document.getElementById('playPauseBtn');
-
-                if (isPlaying) {{
-                    btn.textContent = 'Pause';
-                    btn.classList.add('pause');
-                    startSimulation();
-                }} else {{
-                    btn.textContent = 'Play';
-                    btn.classList.remove('pause');
-                    stopSimulation();
-                }}
-            }}
-
-            // Reset simulation
-            function resetSimulation() {{
-                stopSimulation();
-                currentDate = new Date(startDate);
-                simulationTime = 0;
-                isPlaying = false;
-
-                // Reset node states
-                Object.keys(nodeState).forEach(nodeId => {{
-                    nodeState[nodeId].stock = nodesData[nodeId].initial_stock;
-                    nodeState[nodeId].inbound_rate = 0;
-                    nodeState[nodeId].outbound_rate = 0;
-                }});
-
-                // Reset CO2 data
-                Object.keys(co2Data).forEach(scenario => {{
-                    co2Data[scenario] = {{ truck: 0, rail: 0, air: 0 }};
-                }});
-
-                scenarioComparison.baseline = [];
-                scenarioComparison.green_rail = [];
-                scenarioComparison.local_source = [];
-
-                updateDisplay();
-                updateCharts();
-            }}
-
-            // Update speed
-            document.getElementById('speedSlider').addEventListener('input', function(e) {{
-                simulationSpeed = parseFloat(e.target.value);
-                document.getElementById('speedValue').textContent = simulationSpeed.toFixed(1) + 'x';
-            }});
-
-            // Update scenario
-            document.getElementById('scenarioSelector').addEventListener('change', function(e) {{
-                currentScenario = e.target.value;
-            }});
-
-            // Calculate distance between two coordinates (Haversine formula)
-            function calculateDistance(lat1, lon1, lat2, lon2) {{
-                const R = 6371; // Earth's radius in km
-                const dLat = (lat2 - lat1) * Math.PI / 180;
-                const dLon = (lon2 - lon1) * Math.PI / 180;
-                const a = Math.sin(dLat/2) * Math.sin(dLat/2) +
-                         Math.cos(lat1 * Math.PI / 180) * Math.cos(lat2 * Math.PI / 180) *
-                         Math.sin(dLon/2) * Math.sin(dLon/2);
-                const c = 2 * Math.atan2(Math.sqrt(a), Math.sqrt(Math.sqrt(1-a)));
-                return R * c;
-            }}
-
-            // Get seasonality multiplier
-            function getSeasonalityMultiplier(date) {{
-                const month = date.getMonth() + 1; // 1-12
-
-                if (month === 8 || month === 9) return 1.8; // Back-to-school rush
-                if (month === 1) return 1.3; // New Year
-                if (month === 6 || month === 7) return 0.8; // Summer slump
-                return 1.0; // Normal
-            }}
-
-            // Update node states based on scenario
-            function updateNodeStates() {{
-                const multiplier = getSeasonalityMultiplier(currentDate);
-
-                Object.keys(nodeState).forEach(nodeId => {{
-                    const node = nodeState[nodeId];
-
-                    // Apply production rates (for manufacturing nodes)
-                    if (nodesData[nodeId].type === 'manufacturing') {{
-                        node.production_rate = 50 * multiplier;
-                        node.stock = Math.min(node.capacity, node.stock + node.production_rate / 3600); // per second
-                    }}
-
-                    // Apply sales rates (for retail nodes)
-                    if (nodesData[nodeId].type === 'retail') {{
-                        node.sales_rate = 20 * multiplier;
-                        node.stock = Math.max(0, node.stock - node.sales_rate / 3600);
-                    }}
-
-                    // Update rates based on current scenario
-                    updateScenarioRates(nodeId);
-                }});
-            }}
-
-            // Update rates based on current scenario
-            function updateScenarioRates(nodeId) {{
-                // Reset rates
-                nodeState[nodeId].inbound_rate = 0;
-                nodeState[nodeId].outbound_rate = 0;
-
-                // Apply scenario-specific changes
-                if (currentScenario === 'green_rail') {{
-                    // Shift Romania trucks to rail
-                    if (nodeId === 'N2_ROM') {{
-                        // Reduce outbound to Poland
-                    }}
-                }} else if (currentScenario === 'local_source') {{
-                    // Cancel Sweden, source all wood in Poland
-                    if (nodeId === 'N1_SWE') {{
-                        nodeState[nodeId].production_rate = 0;
-                    }}
-                    if (nodeId === 'N5_FAC') {{
-                        // Increase local sourcing
-                        nodeState[nodeId].production_rate *= 1.5;
-                    }}
-                }}
-            }}
-
-            // Update display elements
-            function updateDisplay() {{
-                document.getElementById('currentDate').textContent =
-                    currentDate.toLocaleDateString('en-US', {{
-                        year: 'numeric',
-                        month: 'short',
-                        day: 'numeric'
-                    }});
-
-                const hours = Math.floor(simulationTime / 3600);
-                const minutes = Math.floor((simulationTime % 3600) / 60);
-                const seconds = Math.floor(simulationTime % 60);
-                document.getElementById('simTime').textContent =
-                    `${{hours.toString().padStart(2, '0')}}:${{minutes.toString().padStart(2, '0')}}:${{seconds.toString().padStart(2, '0')}}`;
-
-                document.getElementById('seasonMultiplier').textContent =
-                    getSeasonalityMultiplier(currentDate).toFixed(1) + 'x';
-
-                // Update inventory displays
-                Object.keys(nodeState).forEach(nodeId => {{
-                    const element = document.getElementById(`inventory-${{nodeId}}`);
-                    if (element) {{
-                        element.innerHTML = `<strong>Stock:</strong> ${{Math.round(nodeState[nodeId].stock)}}/${{nodeState[nodeId].capacity}} units`;
-                    }}
-                }});
-            }}
-
-            // Update charts
-            function updateCharts() {{
-                // Update CO2 bar chart
-                co2Chart.data.datasets[0].data = [
-                    co2Data[currentScenario].truck,
-                    co2Data[currentScenario].rail,
-                    co2Data[currentScenario].air
-                ];
-                co2Chart.update();
-
-                // Update scenario comparison chart
-                const timeLabel = Math.round(simulationTime / 86400); // days
-                if (!scenarioComparison.baseline.includes(timeLabel) ||
-                    scenarioComparison.baseline.length === 0) {{
-
-                    scenarioComparison.baseline.push(timeLabel);
-                    scenarioComparison.green_rail.push(timeLabel);
-                    scenarioComparison.local_source.push(timeLabel);
-
-                    // Add cumulative CO2 values
-                    scenarioChart.data.labels.push(timeLabel);
-                    scenarioChart.data.datasets[0].data.push(
-                        co2Data.baseline.truck + co2Data.baseline.rail + co2Data.baseline.air
-                    );
-                    scenarioChart.data.datasets[1].data.push(
-                        co2Data.green_rail.truck + co2Data.green_rail.rail + co2Data.green_rail.air
-                    );
-                    scenarioChart.data.datasets[2].data.push(
-                        co2Data.local_source.truck + co2Data.local_source.rail + co2Data.local_source.air
-                    );
-                    scenarioChart.update();
-                }}
-            }}
-
-            // Simulation loop with error handling
-            function simulationStep() {{
-                try {{
-                    if (!isPlaying) return;
-
-                    // Check for valid map reference
-                    if (!theMap) {{
-                        console.error('CRITICAL: Map not available during simulation step');
-                        return;
-                    }}
-
-                    // Advance time
-                    const deltaTime = (1/60) * simulationSpeed; // 60 FPS
-                    simulationTime += deltaTime;
-                    currentDate = new Date(startDate.getTime() + simulationTime * 1000);
-
-                    // Update node states
-                    updateNodeStates();
-
-                    // Process active shipments
-                    processShipments();
-
-                    // Update display
-                    updateDisplay();
-
-                    // Update charts periodically
-                    if (Math.floor(simulationTime) % 60 === 0) {{ // Every minute
-                        updateCharts();
-                    }}
-
-                    // Update moving markers
-                    ikeaSimulation.updateMovingMarkers();
-
-                    animationId = requestAnimationFrame(simulationStep);
-                }} catch (error) {{
-                    console.error('CRITICAL: Error in simulation step:', error.message || error);
-                    stopSimulation();
-                }}
-            }}
-
-            // Process shipments and CO2 emissions
-            function processShipments() {{
-                // Simulate shipments based on inventory levels and routes
-                Object.keys(routesData).forEach(routeId => {{
-                    const route = routesData[routeId];
-                    const fromNode = route.from;
-                    const toNode = route.to;
-
-                    // Check if we should send a shipment
-                    if (nodeState[fromNode].stock > route.capacity * 0.8) {{ // 80% capacity trigger
-                        const shipmentSize = Math.min(route.capacity, nodeState[fromNode].stock);
-                        const distance = calculateDistance(
-                            nodesData[fromNode].coords[0], nodesData[fromNode].coords[1],
-                            nodesData[toNode].coords[0], nodesData[toNode].coords[1]
-                        );
-
-                        // Calculate CO2 emissions
-                        const emissions = shipmentSize * distance * route.emission;
-
-                        // Add to CO2 tracking
-                        co2Data[currentScenario][route.vehicle] += emissions;
-
-                        // Update inventory
-                        nodeState[fromNode].stock -= shipmentSize;
-                        nodeState[fromNode].outbound_rate += shipmentSize;
-
-                        // Schedule arrival
-                        setTimeout(() => {{
-                            nodeState[toNode].stock = Math.min(
-                                nodeState[toNode].capacity,
-                                nodeState[toNode].stock + shipmentSize
-                            );
-                            nodeState[toNode].inbound_rate += shipmentSize;
-                        }}, (distance / route.speed) * 3600000); // Convert to milliseconds
-                    }}
-                }});
-            }}
-
-            // Start simulation
-            function startSimulation() {{
-                if (!animationId) {{
-                    simulationStep();
-                }}
-            }}
-
-            // Stop simulation
-            function stopSimulation() {{
-                if (animationId) {{
-                    cancelAnimationFrame(animationId);
-                    animationId = null;
-                }}
-            }}
-
-            // Initialize
-            document.addEventListener('DOMContentLoaded', function() {{
-                initCharts();
-                updateDisplay();
-            }});
-
-            // Handle marker clicks for inspector panel
-            // This would be integrated with the Folium markers
-            function inspectFacility(nodeId) {{
-                const node = nodesData[nodeId];
-                const state = nodeState[nodeId];
-
-                document.getElementById('inspectorContent').innerHTML = `
-                    <h4>${{node.name}}</h4>
-                    <div class="data-row">
-                        <span>Product:</span>
-                        <span>${{node.product}}</span>
-                    </div>
-                    <div class="data-row">
-                        <span>Current Stock:</span>
-                        <span>${{Math.round(state.stock)}} units</span>
-                    </div>
-                    <div class="data-row">
-                        <span>Capacity:</span>
-                        <span>${{state.capacity}} units</span>
-                    </div>
-                    <div class="data-row">
-                        <span>Stock Level:</span>
-                        <span>${{((state.stock / state.capacity) * 100).toFixed(1)}}%</span>
-                    </div>
-                    <div class="data-row">
-                        <span>Inbound Rate:</span>
-                        <span>${{Math.round(state.inbound_rate)}} units/hour</span>
-                    </div>
-                    <div class="data-row">
-                        <span>Outbound Rate:</span>
-                        <span>${{Math.round(state.outbound_rate)}} units/hour</span>
-                    </div>
-                    <div class="data-row">
-                        <span>Production Rate:</span>
-                        <span>${{Math.round(state.production_rate)}} units/hour</span>
-                    </div>
-                    <div class="data-row">
-                        <span>Sales Rate:</span>
-                        <span>${{Math.round(state.sales_rate)}} units/hour</span>
-                    </div>
-                `;
+def create_ikea_simulation():
+    """Create the comprehensive IKEA supply chain simulation"""
 
-                document.getElementById('inspectorPanel').classList.remove('collapsed');
-                document.querySelector('#inspectorPanel .panel-toggle').textContent = '−';
-            }}
-
-            // Make functions globally available
-            window.togglePanel = togglePanel;
-            window.toggleSimulation = toggleSimulation;
-            window.resetSimulation = resetSimulation;
-            window.inspectFacility = inspectFacility;
-        </script>
-    </body>
-    </html>
-    """
+    # Map centered on Europe; the id is also the global the simulation script looks up
+    map_id = 'ikea_map'
+    map_center = [52.0, 15.0]
+    map_zoom = 4
 
-    # Add Chart.js CDN
-    chart_js = '<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>'
-    m.get_root().html.add_child(folium.Element(chart_js))
+    nodes = NODES
+    # Copy routes so the precomputed per-route fields don't leak into ROUTES
+    routes = {route_id: dict(route_data) for route_id, route_data in ROUTES.items()}
 
-    # Add Leaflet.MovingMarker CDN
-    moving_marker_js = '<script src="https://cdn.jsdelivr.net/npm/leaflet-moving-marker@0.0.1/dist/leaflet.moving-marker.min.js"></script>'
-    m.get_root().html.add_child(folium.Element(moving_marker_js))
+    # Collect all facility markers into one GeoJSON FeatureCollection for the browser
+    facility_features = []
+    for node_id, node_data in nodes.items():
+        icon_color = ICON_COLOR[node_data['type']]
+        icon_type = ICON_TYPE[node_data['icon']]
+
+        facility_features.append({
+            'type': 'Feature',
+            'geometry': {
+                'type': 'Point',
+                'coordinates': [node_data['coords'][1], node_data['coords'][0]]
+            },
+            'properties': {
+                'id': node_id,
+                'name': node_data['name'],
+                'product': node_data['product'],
+                'type': node_data['type'].title(),
+                'capacity': node_data['capacity'],
+                'icon_color': icon_color,
+                'icon': icon_type
+            }
+        })
+
+    # Label routes with measured distances and get the thinned paths for the browser
+    route_coordinates = measure_routes(routes, nodes)
+
+    # Pack every path into one flat [lat, lng, lat, lng, ...] column for a JS Float32Array,
+    # with each route's [start, end) slice recorded in route_offsets
+    route_offsets = {}
+    flat_coords = []
+    for route_id, coords in route_coordinates.items():
+        start = len(flat_coords)
+        flat_coords.extend(value for point in coords for value in point)
+        route_offsets[route_id] = [start, len(flat_coords)]
+
+    # Derive travel time and CO2 per trip column-wise over all routes at once
+    route_table = build_route_table(routes)
+    durations = route_table['distance_km'] / route_table['speed'] * 3600
+    co2_per_trip = route_table['distance_km'] * route_table['capacity'] * route_table['emission']
+    direct_km = endpoint_distances_km(routes, nodes)
+    for route_data, duration_s, co2_kg, direct in zip(routes.values(), durations, co2_per_trip, direct_km):
+        route_data['duration_s'] = float(duration_s)
+        route_data['co2_per_trip_kg'] = float(co2_kg)
+        route_data['direct_km'] = float(direct)
+
+    # Initial per-node simulation state
+    node_state = {node_id: {
+        'stock': node_data['initial_stock'],
+        'capacity': node_data['capacity'],
+        'inbound_rate': 0,
+        'outbound_rate': 0,
+        'production_rate': 50 if node_data['type'] == 'manufacturing' else 0,
+        'sales_rate': 20 if node_data['type'] == 'retail' else 0
+    } for node_id, node_data in nodes.items()}
+
+    # Chart.js, Leaflet.markercluster (facilities), Leaflet.AntPath (route paths) and Leaflet.MovingMarker CDNs
+    script_includes = [
+        'https://cdn.jsdelivr.net/npm/chart.js',
+        'https://cdn.jsdelivr.net/npm/leaflet.markercluster@1.5.3/dist/leaflet.markercluster.js',
+        'https://cdn.jsdelivr.net/npm/leaflet-ant-path@1.1.2/dist/leaflet-ant-path.min.js',
+        'https://cdn.jsdelivr.net/npm/leaflet-moving-marker@0.0.1/dist/leaflet.moving-marker.min.js',
+    ]
 
     # Create a custom JavaScript plugin for the simulation logic
     simulation_js = """
@@ -1055,810 +590,958 @@ def create_ikea_simulation():
         console.warn("Map not immediately available, will check later. Map ID:", mapId);
     }
 
+    // Per-vehicle logging fires on every departure and arrival; flip on when debugging
+    const DEBUG = false;
+
     var ikeaSimulation = {
         isPlaying: false,
         simulationSpeed: 1,
         currentScenario: 'baseline',
-        startDate: new Date('2024-01-01T00:00:00'),
-        currentDate: new Date('2024-01-01T00:00:00'),
+        startMs: Date.parse('2024-01-01T00:00:00'),
+        // Calendar fields are only recomputed when the simulated clock crosses midnight
+        currentMonth: 1,
+        currentDateStr: '',
+        MONTH_NAMES: ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
+        dayStartMs: 0,
+        nextDayMs: 0,
         simulationTime: 0,
-        nodeState: {json.dumps({node_id: {
-            'stock': node_data['initial_stock'],
-            'capacity': node_data['capacity'],
-            'inbound_rate': 0,
-            'outbound_rate': 0,
-            'production_rate': 50 if node_data['type'] == 'manufacturing' else 0,
-            'sales_rate': 20 if node_data['type'] == 'retail' else 0
-        } for node_id, node_data in nodes.items()})},
-        routesData: {json.dumps(routes)},
-        nodesData: {json.dumps(nodes)},
-        routeCoordinates: {json.dumps(route_coordinates)},
+        nodeState: NODE_STATE_PLACEHOLDER,
+        routesData: ROUTES_DATA_PLACEHOLDER,
+        nodesData: NODES_DATA_PLACEHOLDER,
+        // All route paths as one flat lat/lng column; routeOffsets[routeId] is its [start, end) slice
+        routeCoordsFlat: new Float32Array(ROUTE_COORDS_FLAT_PLACEHOLDER),
+        routeOffsets: ROUTE_OFFSETS_PLACEHOLDER,
+        facilityFeatures: FACILITY_FEATURES_PLACEHOLDER,
+        // Per-scenario rate adjustments, generated in Python; applyScenario points at the active one
+        scenarioAppliers: SCENARIO_APPLIERS_PLACEHOLDER,
+        co2Categories: { truck: 'truck', train: 'rail', plane: 'air' },
         movingMarkers: {},
-        co2Data: {
-            baseline: { truck: 0, rail: 0, air: 0 },
-            green_rail: { truck: 0, rail: 0, air: 0 },
-            local_source: { truck: 0, rail: 0, air: 0 }
-        },
-        scenarioComparison: {
-            baseline: [],
-            green_rail: [],
-            local_source: []
-        },
+        // Cumulative CO2 in one flat column: co2Arr[scenario * 3 + category]
+        SCENARIO_IDX: { baseline: 0, green_rail: 1, local_source: 2 },
+        CO2_CATEGORY_IDX: { truck: 0, rail: 1, air: 2 },
+        co2Arr: new Float64Array(9),
+        // Running per-scenario totals across all categories, indexed by SCENARIO_IDX
+        co2TotalArr: new Float64Array(3),
+        // Last day plotted on the scenario chart, which keeps a sliding window of days
+        lastPlottedDay: null,
+        maxChartPoints: 365,
         charts: {},
-
-        init: function() {{
+        chartUpdatePending: false,
+        lastStock: {},
+        popupStockEls: {},
+        inspectedNodeId: null,
+        lastDisplaySec: -1,
+        lastChartMinute: -1,
+        lastChartUpdate: -Infinity,
+        // Fixed simulation step in wall-clock milliseconds
+        tickMs: 100,
+        vehicleDwellSec: 3,
+        tickAccumulator: 0,
+        lastFrameTs: null,
+        // Seasonality multiplier by month (index 1-12, 0 unused), cached for the current day
+        SEASON: new Float64Array(SEASON_PLACEHOLDER),
+        seasonMultiplier: 1.0,
+        eventQueue: [],
+
+        init: function() {
             console.log('IKEA Simulation init starting...');
+
+            this.initStateArrays();
+            this.updateCalendar();
+            this.applyScenario = this.scenarioAppliers[this.currentScenario];
+
+            // Static UI elements are looked up once; popup inventory spans come and go
+            this.dom = {
+                currentDate: document.getElementById('currentDate'),
+                simTime: document.getElementById('simTime'),
+                seasonMultiplier: document.getElementById('seasonMultiplier'),
+                playPauseBtn: document.getElementById('playPauseBtn'),
+                speedValue: document.getElementById('speedValue'),
+                inspectorContent: document.getElementById('inspectorContent'),
+                inspectorPanel: document.getElementById('inspectorPanel'),
+                inspectorToggle: document.querySelector('#inspectorPanel .panel-toggle')
+            };
             // Moving markers functionality
 
-            this.createMovingMarker = function(routeId, vehicleType) {{
-                console.log('Creating moving marker for route:', routeId, 'type:', vehicleType);
-                const routeCoords = this.routeCoordinates[routeId];
-                console.log('Route coordinates:', routeCoords);
+            this.createMovingMarker = function(routeId, vehicleType) {
+                DEBUG && console.log('Creating moving marker for route:', routeId, 'type:', vehicleType);
+                const offsets = this.routeOffsets[routeId];
+                const pointCount = offsets ? (offsets[1] - offsets[0]) / 2 : 0;
 
-                if (!routeCoords || routeCoords.length < 2) {{
-                    console.log('Invalid route coordinates for', routeId);
+                if (pointCount < 2) {
+                    DEBUG && console.log('Invalid route coordinates for', routeId);
                     return null;
-                }}
+                }
 
+                // Distance and travel time are precomputed in Python
                 const route = this.routesData[routeId];
-                const speedKmh = route.speed;
-                const distance = this.calculateRouteDistance(routeCoords);
-                const duration = (distance / speedKmh) * 3600000 / this.simulationSpeed;
+                const distance = route.distance_km;
+                // Trip time in simulated milliseconds; playback speed is applied per frame
+                const duration = route.duration_s * 1000;
+
+                DEBUG && console.log('Route distance:', distance, 'km, duration:', duration, 'ms');
+
+                // Simulated time at which the vehicle reaches the end of each segment,
+                // split in proportion to the segment lengths precomputed in Python
+                const segmentEnds = new Float64Array(pointCount - 1);
+                let totalKm = 0;
+                for (let i = 0; i < segmentEnds.length; i++) {
+                    totalKm += route.segment_km[i];
+                    segmentEnds[i] = totalKm;
+                }
+                for (let i = 0; i < segmentEnds.length; i++) {
+                    segmentEnds[i] = totalKm > 0 ? duration * segmentEnds[i] / totalKm : duration * (i + 1) / segmentEnds.length;
+                }
 
-                console.log('Route distance:', distance, 'km, duration:', duration, 'ms');
+            try {
+                // Create a simple moving marker using standard Leaflet
+                // One LatLng per vehicle, updated in place as it moves
+                const latLng = L.latLng(this.routeCoordsFlat[offsets[0]], this.routeCoordsFlat[offsets[0] + 1]);
+                const marker = L.marker(latLng, {
+                    icon: this.vehicleIcons[vehicleType] || this.vehicleIcons.truck
+                }).addTo(this.map);
 
-                const iconHtml = this.getVehicleIcon(vehicleType);
-                console.log('Vehicle icon HTML:', iconHtml);
+                DEBUG && console.log('Moving marker created successfully for', routeId);
 
-            try {{
-                // Create a simple moving marker using standard Leaflet
-                const marker = L.marker(routeCoords[0], {{
-                    icon: L.divIcon({{
-                        html: iconHtml,
-                        className: 'vehicle-icon',
-                        iconSize: [30, 30],
-                        iconAnchor: [15, 15]
-                    }})
-                }}).addTo(this.map);
-
-                console.log('Moving marker created successfully for', routeId);
-
-                this.movingMarkers[routeId] = {{
+                this.movingMarkers[routeId] = {
                     marker: marker,
+                    latLng: latLng,
                     routeId: routeId,
                     vehicleType: vehicleType,
-                    routeCoords: routeCoords,
+                    coordStart: offsets[0],
+                    coordEnd: offsets[1],
                     duration: duration,
+                    segmentEnds: segmentEnds,
+                    departTime: 0,
+                    elapsed: 0,
                     distance: distance,
                     isMoving: false,
                     lastStartTime: 0,
-                    currentPosition: 0, // index in routeCoords
-                    animationId: null
-                }};
+                    currentPosition: 0 // index of the segment being travelled
+                };
 
                 return marker;
-                }} catch (error) {{
+                } catch (error) {
                     console.error('Error creating moving marker:', error.message || error);
                     return null;
-                }}
-            }};
-
-            this.getVehicleIcon = function(vehicleType) {{
-                const icons = {{
-                    truck: '<div style="color: blue; font-size: 20px;">🚛</div>',
-                    rail: '<div style="color: green; font-size: 20px;">🚂</div>',
-                    air: '<div style="color: red; font-size: 20px;">✈️</div>',
-                    multimodal: '<div style="color: purple; font-size: 20px;">🚛</div>'
-                }};
-                return icons[vehicleType] || icons.truck;
-            }};
-
-            this.calculateRouteDistance = function(coords) {{
-                let totalDistance = 0;
-                for (let i = 1; i < coords.length; i++) {{
-                    totalDistance += this.calculateDistance(
-                        coords[i-1][0], coords[i-1][1],
-                        coords[i][0], coords[i][1]
-                    );
-                }}
-                return totalDistance;
-            }};
-
-            this.startVehicleMovement = function(routeId) {{
-                console.log('Starting vehicle movement for', routeId);
+                }
+            };
+
+            // One shared divIcon per vehicle type instead of one per marker
+            const iconHtml = {
+                truck: '<div style="color: blue; font-size: 20px;">🚛</div>',
+                rail: '<div style="color: green; font-size: 20px;">🚂</div>',
+                air: '<div style="color: red; font-size: 20px;">✈️</div>',
+                multimodal: '<div style="color: purple; font-size: 20px;">🚛</div>'
+            };
+            this.vehicleIcons = {};
+            Object.keys(iconHtml).forEach(type => {
+                this.vehicleIcons[type] = L.divIcon({
+                    html: iconHtml[type],
+                    className: 'vehicle-icon',
+                    iconSize: [30, 30],
+                    iconAnchor: [15, 15]
+                });
+            });
+
+            this.startVehicleMovement = function(routeId) {
+                DEBUG && console.log('Starting vehicle movement for', routeId);
+                if (!this.movingMarkers[routeId]) {
+                    this.createMovingMarker(routeId, this.routesData[routeId].mode);
+                }
                 const vehicle = this.movingMarkers[routeId];
-                if (vehicle && !vehicle.isMoving && vehicle.routeCoords.length > 1) {{
+                if (vehicle && !vehicle.isMoving) {
                     vehicle.isMoving = true;
                     vehicle.lastStartTime = Date.now();
                     vehicle.currentPosition = 0;
+                    vehicle.departTime = this.simulationTime;
+                    vehicle.elapsed = 0;
+                    this.activeVehicles.push(vehicle);
+                }
+            };
 
-                    // Calculate step duration based on total duration and number of steps
-                    const stepDuration = vehicle.duration / (vehicle.routeCoords.length - 1);
+            // Vehicles move on the simulation clock, positioned once per frame from simulationStep
+            this.activeVehicles = [];
+            this.parkedVehicles = [];
 
-                    const animate = () => {{
-                        if (!vehicle.isMoving) return;
+            this.advanceVehicles = function(renderTime) {
+                const coords = this.routeCoordsFlat;
+                let arrivals = 0;
+                for (let v = 0; v < this.activeVehicles.length; v++) {
+                    const vehicle = this.activeVehicles[v];
+                    const ends = vehicle.segmentEnds;
+                    vehicle.elapsed = (renderTime - vehicle.departTime) * 1000;
 
+                    while (vehicle.currentPosition < ends.length && vehicle.elapsed >= ends[vehicle.currentPosition]) {
                         vehicle.currentPosition++;
+                    }
 
-                        if (vehicle.currentPosition >= vehicle.routeCoords.length) {{
-                            // Vehicle has reached the end
-                            this.onVehicleArrival(routeId);
-                            return;
-                        }}
-
-                        // Move marker to next position
-                        const nextCoord = vehicle.routeCoords[vehicle.currentPosition];
-                        vehicle.marker.setLatLng(nextCoord);
+                    if (vehicle.currentPosition >= ends.length) {
+                        // Vehicle has reached the end
+                        this.placeVehicle(vehicle, vehicle.coordEnd - 2);
+                        arrivals++;
+                        continue;
+                    }
 
-                        // Schedule next movement
-                        vehicle.animationId = setTimeout(animate, stepDuration);
-                    }};
+                    // Interpolate along the current segment, writing into the vehicle's own LatLng
+                    const k = vehicle.currentPosition;
+                    const segmentStart = k > 0 ? ends[k - 1] : 0;
+                    const span = ends[k] - segmentStart;
+                    const frac = span > 0 ? (vehicle.elapsed - segmentStart) / span : 1;
+                    const a = vehicle.coordStart + 2 * k;
+                    vehicle.latLng.lat = coords[a] + (coords[a + 2] - coords[a]) * frac;
+                    vehicle.latLng.lng = coords[a + 1] + (coords[a + 3] - coords[a + 1]) * frac;
+                    vehicle.marker.setLatLng(vehicle.latLng);
+                }
 
-                    // Start animation
-                    animate();
-                }}
-            }};
+                if (arrivals) {
+                    // Compact the active list in place, handing arrived vehicles over as we go
+                    const active = this.activeVehicles;
+                    let kept = 0;
+                    for (let v = 0; v < active.length; v++) {
+                        const vehicle = active[v];
+                        if (vehicle.currentPosition < vehicle.segmentEnds.length) {
+                            active[kept++] = vehicle;
+                        } else {
+                            this.onVehicleArrival(vehicle.routeId);
+                        }
+                    }
+                    active.length = kept;
+                }
+            };
 
-            this.onVehicleArrival = function(routeId) {{
-                console.log('Vehicle arrived at destination for', routeId);
+            this.onVehicleArrival = function(routeId) {
+                DEBUG && console.log('Vehicle arrived at destination for', routeId);
                 const vehicle = this.movingMarkers[routeId];
-                if (vehicle) {{
+                if (vehicle) {
                     vehicle.isMoving = false;
-                    setTimeout(() => {{
-                        if (this.movingMarkers[routeId]) {{
-                            this.resetVehiclePosition(routeId);
-                        }}
-                    }}, 3000);
-                }}
-            }};
-
-            this.resetVehiclePosition = function(routeId) {{
+                    this.scheduleSpawn(routeId);
+                    // Park at the destination for a moment before returning to the origin
+                    vehicle.resetSimTime = this.simulationTime + this.vehicleDwellSec;
+                    this.parkedVehicles.push(vehicle);
+                }
+            };
+
+            this.resetVehiclePosition = function(routeId) {
                 const vehicle = this.movingMarkers[routeId];
-                if (vehicle) {{
-                    // Clear any ongoing animation
-                    if (vehicle.animationId) {{
-                        clearTimeout(vehicle.animationId);
-                        vehicle.animationId = null;
-                    }}
+                if (vehicle) {
+                    // Take it off the simulation clock
+                    this.activeVehicles = this.activeVehicles.filter(active => active !== vehicle);
+                    this.parkedVehicles = this.parkedVehicles.filter(parked => parked !== vehicle);
 
                     // Reset to starting position
-                    const routeCoords = this.routeCoordinates[routeId];
-                    if (routeCoords && routeCoords.length > 0) {{
-                        vehicle.marker.setLatLng(routeCoords[0]);
-                    }}
+                    this.placeVehicle(vehicle, vehicle.coordStart);
                     vehicle.isMoving = false;
                     vehicle.currentPosition = 0;
-                }}
-            }};
+                }
+            };
 
-            this.        initializeMovingMarkers = function() {{
+            this.        initializeMovingMarkers = function() {
             console.log('Initializing moving markers...');
 
             // Check for map availability
-            if (!theMap) {{
+            if (!theMap) {
                 theMap = window[mapId]; // Try again
-            }}
-            if (!theMap) {{
+            }
+            if (!theMap) {
                 console.error('CRITICAL: Map not available for moving markers initialization');
                 return;
-            }}
+            }
 
             // Store map reference
             this.map = theMap;
 
-                Object.keys(this.routesData).forEach(routeId => {{
-                    const route = this.routesData[routeId];
-                    this.createMovingMarker(routeId, route.vehicle);
-                }});
+                this.departureQueue = [];
+                // No markers are created here: first departures are queued for time zero and
+                // dispatched by the first tick after Play, which creates each route's marker
+                const routeIds = this.routeIds;
+                for (let i = 0, n = routeIds.length; i < n; i++) {
+                    this.scheduleSpawn(routeIds[i], true);
+                }
+            };
 
-                // Force start a test vehicle immediately
-                setTimeout(() => {{
-                    console.log('Starting test vehicle...');
-                    this.startVehicleMovement('china_poland'); // Start China->Poland train
-                }}, 2000);
-            }};
+            this.scheduleSpawn = function(routeId, first) {
+                // Every route's first departure leaves straight away; after that departures form
+                // a Poisson process with an exponential wait between them
+                // (route frequency is the mean number of days between departures)
+                const meanInterval = this.routesData[routeId].frequency * 86400;
+                this.pushEvent(this.departureQueue, {
+                    t: first ? this.simulationTime : this.simulationTime - Math.log(1 - Math.random()) * meanInterval,
+                    routeId: routeId
+                });
+            };
 
-            this.updateMovingMarkers = function() {{
-                try {{
+            this.updateMovingMarkers = function() {
+                try {
                     // Check for valid map reference before updating markers
-                    if (!theMap) {{
+                    if (!theMap) {
                         console.error('CRITICAL: Map not available for moving markers update');
                         return;
-                    }}
+                    }
 
-                    Object.keys(this.routesData).forEach(routeId => {{
-                        const route = this.routesData[routeId];
+                    // Only the departures that are due are touched; each route has at most one
+                    // pending, and the next one is drawn when its vehicle arrives
+                    const queue = this.departureQueue;
+                    while (queue.length && queue[0].t <= this.simulationTime) {
+                        const routeId = this.popEvent(queue).routeId;
                         const vehicle = this.movingMarkers[routeId];
+                        if (!vehicle || !vehicle.isMoving) {
+                            this.startVehicleMovement(routeId);
+                        }
+                    }
 
-                        if (vehicle && !vehicle.isMoving) {{
-                            const startChance = (1 / route.frequency) * (this.simulationTime / 3600);
-                            if (Math.random() < startChance * 0.5) {{
-                                this.startVehicleMovement(routeId);
-                            }}
-                        }}
-                    }});
-                }} catch (error) {{
+                    // Send parked vehicles home once their dwell is over, unless they've left again
+                    const parked = this.parkedVehicles;
+                    let kept = 0;
+                    for (let v = 0; v < parked.length; v++) {
+                        const vehicle = parked[v];
+                        if (this.simulationTime < vehicle.resetSimTime) {
+                            parked[kept++] = vehicle;
+                        } else if (!vehicle.isMoving) {
+                            this.placeVehicle(vehicle, vehicle.coordStart);
+                            vehicle.currentPosition = 0;
+                        }
+                    }
+                    parked.length = kept;
+                } catch (error) {
                     console.error('CRITICAL: Error updating moving markers:', error.message || error);
-                }}
-            }};
+                }
+            };
 
             console.log('Moving marker code loaded');
+            if (!theMap) {
+                theMap = window[mapId];
+            }
+            if (theMap) {
+                this.addFacilityMarkers();
+                this.addRoutePaths();
+                this.initializeMovingMarkers();
+            } else {
+                console.error('CRITICAL: Map not available for facility markers and routes');
+            }
             this.setupEventListeners();
             this.initCharts();
             this.updateDisplay();
             console.log('IKEA Simulation initialized');
-        }},
+        },
 
-        setupEventListeners: function() {{
+        initStateArrays: function() {
+            // Node state lives in parallel typed arrays indexed by position in nodeIds;
+            // nodeState only carries the initial values from Python
+            const nodeIds = Object.keys(this.nodeState);
+            const n = nodeIds.length;
+            this.nodeIds = nodeIds;
+            this.nodeIdToIdx = {};
+            this.stockArr = new Float64Array(n);
+            this.capacityArr = new Float64Array(n);
+            this.productionRateArr = new Float64Array(n);
+            this.salesRateArr = new Float64Array(n);
+            this.inboundRateArr = new Float64Array(n);
+            this.outboundRateArr = new Float64Array(n);
+            const manufacturing = [];
+            const retail = [];
+            for (let i = 0; i < n; i++) {
+                const nodeId = nodeIds[i];
+                const state = this.nodeState[nodeId];
+                const type = this.nodesData[nodeId].type;
+                this.nodeIdToIdx[nodeId] = i;
+                this.stockArr[i] = state.stock;
+                this.capacityArr[i] = state.capacity;
+                this.productionRateArr[i] = state.production_rate;
+                this.salesRateArr[i] = state.sales_rate;
+                this.inboundRateArr[i] = state.inbound_rate;
+                this.outboundRateArr[i] = state.outbound_rate;
+                if (type === 'manufacturing') manufacturing.push(i);
+                else if (type === 'retail') retail.push(i);
+            }
+            // Producing and selling nodes are updated in their own loops each tick
+            this.manufacturingIdx = Int32Array.from(manufacturing);
+            this.retailIdx = Int32Array.from(retail);
+
+            // Routes get the same treatment; shipment distances come precomputed from Python
+            const routeIds = Object.keys(this.routesData);
+            const r = routeIds.length;
+            this.routeIds = routeIds;
+            this.routeFromIdx = new Int32Array(r);
+            this.routeToIdx = new Int32Array(r);
+            this.routeCapacity = new Float64Array(r);
+            this.routeEmission = new Float64Array(r);
+            this.routeDistanceKm = new Float64Array(r);
+            this.routeTravelSec = new Float64Array(r);
+            this.routeCo2Offset = new Uint8Array(r);
+            for (let i = 0; i < r; i++) {
+                const route = this.routesData[routeIds[i]];
+                const distance = route.direct_km;
+                this.routeFromIdx[i] = this.nodeIdToIdx[route.from];
+                this.routeToIdx[i] = this.nodeIdToIdx[route.to];
+                this.routeCapacity[i] = route.capacity;
+                this.routeEmission[i] = route.emission;
+                this.routeDistanceKm[i] = distance;
+                this.routeTravelSec[i] = distance / route.speed * 3600;
+                this.routeCo2Offset[i] = this.CO2_CATEGORY_IDX[this.co2Categories[route.vehicle]];
+            }
+        },
+
+        getNodeState: function(nodeId) {
+            const i = this.nodeIdToIdx[nodeId];
+            return {
+                stock: this.stockArr[i],
+                capacity: this.capacityArr[i],
+                inbound_rate: this.inboundRateArr[i],
+                outbound_rate: this.outboundRateArr[i],
+                production_rate: this.productionRateArr[i],
+                sales_rate: this.salesRateArr[i]
+            };
+        },
+
+        setupEventListeners: function() {
             console.log('Setting up event listeners...');
             const playBtn = document.getElementById('playPauseBtn');
-            if (playBtn) {{
+            if (playBtn) {
                 console.log('Play button found, adding listener');
-                playBtn.addEventListener('click', () => {{
+                playBtn.addEventListener('click', () => {
                     console.log('Play button clicked');
                     this.toggleSimulation();
-                }});
-            }} else {{
+                });
+            } else {
                 console.error('Play button NOT found');
-            }}
+            }
 
             const resetBtn = document.getElementById('resetBtn');
-            if (resetBtn) {{
+            if (resetBtn) {
                 resetBtn.addEventListener('click', () => this.resetSimulation());
-            }}
+            }
 
             const speedSlider = document.getElementById('speedSlider');
-            if (speedSlider) {{
-                speedSlider.addEventListener('input', (e) => {{
+            if (speedSlider) {
+                speedSlider.addEventListener('input', (e) => {
                     this.simulationSpeed = parseFloat(e.target.value);
-                    document.getElementById('speedValue').textContent = this.simulationSpeed.toFixed(1) + 'x';
-                }});
-            }}
+                    this.dom.speedValue.textContent = this.simulationSpeed.toFixed(1) + 'x';
+                });
+            }
 
             const scenarioSelector = document.getElementById('scenarioSelector');
-            if (scenarioSelector) {{
-                scenarioSelector.addEventListener('change', (e) => {{
+            if (scenarioSelector) {
+                scenarioSelector.addEventListener('change', (e) => {
                     this.currentScenario = e.target.value;
-                }});
-            }}
+                    this.applyScenario = this.scenarioAppliers[this.currentScenario];
+                });
+            }
             
-            document.querySelectorAll('.panel-header').forEach(header => {{
+            document.querySelectorAll('.panel-header').forEach(header => {
                 header.addEventListener('click', () => this.togglePanel(header.parentElement.id));
-            }});
-        }},
+            });
+        },
 
-        toggleSimulation: function() {{
+        toggleSimulation: function() {
             this.isPlaying = !this.isPlaying;
-            const btn = document.getElementById('playPauseBtn');
-            if (this.isPlaying) {{
+            const btn = this.dom.playPauseBtn;
+            if (this.isPlaying) {
                 btn.textContent = 'Pause';
                 btn.classList.add('pause');
                 this.startSimulation();
-            }} else {{
+            } else {
                 btn.textContent = 'Play';
                 btn.classList.remove('pause');
                 this.stopSimulation();
-            }}
-        }},
+            }
+        },
 
-        resetSimulation: function() {{
+        resetSimulation: function() {
             this.stopSimulation();
-            this.currentDate = new Date(this.startDate);
             this.simulationTime = 0;
+            this.lastDisplaySec = -1;
+            this.lastChartMinute = -1;
+            this.updateCalendar();
             this.isPlaying = false;
+            this.eventQueue = [];
 
-            Object.keys(this.nodeState).forEach(nodeId => {{
-                this.nodeState[nodeId].stock = this.nodesData[nodeId].initial_stock;
-                this.nodeState[nodeId].inbound_rate = 0;
-                this.nodeState[nodeId].outbound_rate = 0;
-            }});
+            for (let i = 0; i < this.nodeIds.length; i++) {
+                this.stockArr[i] = this.nodesData[this.nodeIds[i]].initial_stock;
+            }
+            this.inboundRateArr.fill(0);
+            this.outboundRateArr.fill(0);
+
+            this.co2Arr.fill(0);
+            this.co2TotalArr.fill(0);
 
-            Object.keys(this.co2Data).forEach(scenario => {{
-                this.co2Data[scenario] = {{ truck: 0, rail: 0, air: 0 }};
-            }});
+            this.lastPlottedDay = null;
 
-            this.scenarioComparison = {{
-                baseline: [],
-                green_rail: [],
-                local_source: []
-            }};
+            // Send every vehicle back to its origin and redraw departures from time zero
+            this.departureQueue = [];
+            for (let i = 0; i < this.routeIds.length; i++) {
+                const routeId = this.routeIds[i];
+                this.resetVehiclePosition(routeId);
+                this.scheduleSpawn(routeId, true);
+            }
 
             this.updateDisplay();
             this.updateCharts();
-        }},
-
-        getSeasonalityMultiplier: function(date) {{
-            const month = date.getMonth() + 1;
-            if (month === 8 || month === 9) return 1.8;
-            if (month === 1) return 1.3;
-            if (month === 6 || month === 7) return 0.8;
-            return 1.0;
-        }},
-
-        calculateDistance: function(lat1, lon1, lat2, lon2) {{
-            const R = 6371;
-            const dLat = (lat2 - lat1) * Math.PI / 180;
-            const dLon = (lon2 - lon1) * Math.PI / 180;
-            const a = Math.sin(dLat/2) * Math.sin(dLat/2) +
-                     Math.cos(lat1 * Math.PI / 180) * Math.cos(lat2 * Math.PI / 180) *
-                     Math.sin(dLon/2) * Math.sin(dLon/2);
-            const c = 2 * Math.atan2(Math.sqrt(a), Math.sqrt(Math.sqrt(1-a)));
-            return R * c;
-        }},
-
-        updateNodeStates: function() {{
-            const multiplier = this.getSeasonalityMultiplier(this.currentDate);
-
-            Object.keys(this.nodeState).forEach(nodeId => {{
-                const node = this.nodeState[nodeId];
-                if (this.nodesData[nodeId].type === 'manufacturing') {{
-                    node.production_rate = 50 * multiplier;
-                    node.stock = Math.min(node.capacity, node.stock + node.production_rate / 3600);
-                }}
-                if (this.nodesData[nodeId].type === 'retail') {{
-                    node.sales_rate = 20 * multiplier;
-                    node.stock = Math.max(0, node.stock - node.sales_rate / 3600);
-                }}
-                this.updateScenarioRates(nodeId);
-            }});
-        }},
-
-        updateScenarioRates: function(nodeId) {{
-            this.nodeState[nodeId].inbound_rate = 0;
-            this.nodeState[nodeId].outbound_rate = 0;
-
-            if (this.currentScenario === 'green_rail') {{
-                if (nodeId === 'N2_ROM') {{
-                    // Reduce Romania outbound
-                }}
-            }} else if (this.currentScenario === 'local_source') {{
-                if (nodeId === 'N1_SWE') {{
-                    this.nodeState[nodeId].production_rate = 0;
-                }}
-                if (nodeId === 'N5_FAC') {{
-                    this.nodeState[nodeId].production_rate *= 1.5;
-                }}
-            }}
-        }},
-
-        processShipments: function() {{
-            Object.keys(this.routesData).forEach(routeId => {{
-                const route = this.routesData[routeId];
-                const fromNode = route.from;
-                const toNode = route.to;
-
-                if (this.nodeState[fromNode].stock > route.capacity * 0.8) {{
-                    const shipmentSize = Math.min(route.capacity, this.nodeState[fromNode].stock);
-                    const distance = this.calculateDistance(
-                        this.nodesData[fromNode].coords[0], this.nodesData[fromNode].coords[1],
-                        this.nodesData[toNode].coords[0], this.nodesData[toNode].coords[1]
-                    );
-
-                    const emissions = shipmentSize * distance * route.emission;
-                    this.co2Data[this.currentScenario][route.vehicle] += emissions;
-
-                    this.nodeState[fromNode].stock -= shipmentSize;
-                    this.nodeState[fromNode].outbound_rate += shipmentSize;
-
-                    setTimeout(() => {{
-                        this.nodeState[toNode].stock = Math.min(
-                            this.nodeState[toNode].capacity,
-                            this.nodeState[toNode].stock + shipmentSize
-                        );
-                        this.nodeState[toNode].inbound_rate += shipmentSize;
-                    }}, (distance / route.speed) * 3600000);
-                }}
-            }});
-        }},
-
-        updateDisplay: function() {{
-            document.getElementById('currentDate').textContent =
-                this.currentDate.toLocaleDateString('en-US', {{
-                    year: 'numeric',
-                    month: 'short',
-                    day: 'numeric'
-                }});
-
-            const hours = Math.floor(this.simulationTime / 3600);
-            const minutes = Math.floor((this.simulationTime % 3600) / 60);
-            const seconds = Math.floor(this.simulationTime % 60);
-            document.getElementById('simTime').textContent =
-                `${{hours.toString().padStart(2, '0')}}:${{minutes.toString().padStart(2, '0')}}:${{seconds.toString().padStart(2, '0')}}`;
-
-            document.getElementById('seasonMultiplier').textContent =
-                this.getSeasonalityMultiplier(this.currentDate).toFixed(1) + 'x';
-
-            Object.keys(this.nodeState).forEach(nodeId => {{
-                const element = document.getElementById(`inventory-${{nodeId}}`);
-                if (element) {{
-                    const stock = Math.round(this.nodeState[nodeId].stock);
-                    const capacity = this.nodeState[nodeId].capacity;
-                    element.innerHTML = `<strong>Stock:</strong> ${{stock}}/${{capacity}} units`;
-                }}
-            }});
-        }},
-
-        initCharts: function() {{
+        },
+
+        updateCalendar: function() {
+            const currentMs = this.startMs + this.simulationTime * 1000;
+            if (currentMs >= this.dayStartMs && currentMs < this.nextDayMs) return;
+
+            const date = new Date(currentMs);
+            this.currentMonth = date.getMonth() + 1;
+            this.seasonMultiplier = this.getSeasonalityMultiplier(this.currentMonth);
+            this.currentDateStr = this.MONTH_NAMES[date.getMonth()] + ' ' + date.getDate() + ', ' + date.getFullYear();
+            this.dayStartMs = new Date(date.getFullYear(), date.getMonth(), date.getDate()).getTime();
+            this.nextDayMs = new Date(date.getFullYear(), date.getMonth(), date.getDate() + 1).getTime();
+        },
+
+        getSeasonalityMultiplier: function(month) {
+            return this.SEASON[month];
+        },
+
+        updateNodeStates: function(deltaTime) {
+            // Rates are per simulated hour; deltaTime is the simulated seconds in this tick
+            const multiplier = this.seasonMultiplier;
+
+            const stock = this.stockArr;
+            const capacity = this.capacityArr;
+            const production = this.productionRateArr;
+            const sales = this.salesRateArr;
+            const productionRate = 50 * multiplier;
+            const salesRate = 20 * multiplier;
+
+            const manufacturing = this.manufacturingIdx;
+            for (let k = 0, n = manufacturing.length; k < n; k++) {
+                const i = manufacturing[k];
+                production[i] = productionRate;
+                stock[i] = Math.min(capacity[i], stock[i] + productionRate * deltaTime / 3600);
+            }
+
+            const retail = this.retailIdx;
+            for (let k = 0, n = retail.length; k < n; k++) {
+                const i = retail[k];
+                sales[i] = salesRate;
+                stock[i] = Math.max(0, stock[i] - salesRate * deltaTime / 3600);
+            }
+            this.updateScenarioRates();
+        },
+
+        updateScenarioRates: function() {
+            this.inboundRateArr.fill(0);
+            this.outboundRateArr.fill(0);
+            this.applyScenario();
+        },
+
+        processShipments: function() {
+            const stock = this.stockArr;
+            const co2 = this.co2Arr;
+            const scenarioIdx = this.SCENARIO_IDX[this.currentScenario];
+            const co2Base = scenarioIdx * 3;
+
+            for (let r = 0, n = this.routeIds.length; r < n; r++) {
+                const fromIdx = this.routeFromIdx[r];
+                const capacity = this.routeCapacity[r];
+
+                if (stock[fromIdx] > capacity * 0.8) {
+                    const shipmentSize = Math.min(capacity, stock[fromIdx]);
+
+                    const emitted = shipmentSize * this.routeDistanceKm[r] * this.routeEmission[r];
+                    co2[co2Base + this.routeCo2Offset[r]] += emitted;
+                    this.co2TotalArr[scenarioIdx] += emitted;
+
+                    stock[fromIdx] -= shipmentSize;
+                    this.outboundRateArr[fromIdx] += shipmentSize;
+
+                    // Arrival is scheduled in simulated time, so it follows simulationSpeed
+                    this.pushEvent(this.eventQueue, {
+                        t: this.simulationTime + this.routeTravelSec[r],
+                        toIdx: this.routeToIdx[r],
+                        shipmentSize: shipmentSize
+                    });
+                }
+            }
+        },
+
+        processArrivals: function() {
+            const queue = this.eventQueue;
+            while (queue.length && queue[0].t <= this.simulationTime) {
+                const event = this.popEvent(queue);
+                const i = event.toIdx;
+                this.stockArr[i] = Math.min(this.capacityArr[i], this.stockArr[i] + event.shipmentSize);
+                this.inboundRateArr[i] += event.shipmentSize;
+            }
+        },
+
+        pushEvent: function(queue, event) {
+            // Binary min-heap on event time
+            let i = queue.push(event) - 1;
+            while (i > 0) {
+                const parent = (i - 1) >> 1;
+                if (queue[parent].t <= event.t) break;
+                queue[i] = queue[parent];
+                i = parent;
+            }
+            queue[i] = event;
+        },
+
+        popEvent: function(queue) {
+            const top = queue[0];
+            const last = queue.pop();
+            if (queue.length) {
+                let i = 0;
+                while (true) {
+                    let child = 2 * i + 1;
+                    if (child >= queue.length) break;
+                    if (child + 1 < queue.length && queue[child + 1].t < queue[child].t) child++;
+                    if (queue[child].t >= last.t) break;
+                    queue[i] = queue[child];
+                    i = child;
+                }
+                queue[i] = last;
+            }
+            return top;
+        },
+
+        updateDisplay: function() {
+            // The clock readouts only change when a whole simulated second has passed
+            const totalSeconds = this.simulationTime | 0;
+            if (totalSeconds !== this.lastDisplaySec) {
+                this.lastDisplaySec = totalSeconds;
+                const hours = (totalSeconds / 3600) | 0;
+                const minutes = ((totalSeconds % 3600) / 60) | 0;
+                const seconds = totalSeconds % 60;
+                const pad = n => n < 10 ? '0' + n : '' + n;
+                this.dom.simTime.textContent = pad(hours) + ':' + pad(minutes) + ':' + pad(seconds);
+                this.dom.currentDate.textContent = this.currentDateStr;
+                this.dom.seasonMultiplier.textContent = this.seasonMultiplier.toFixed(1) + 'x';
+                if (this.inspectedNodeId) this.refreshInspector();
+            }
+
+            // Only touch the open popups whose rounded stock actually changed
+            for (const nodeId in this.popupStockEls) {
+                const stock = Math.round(this.stockArr[this.nodeIdToIdx[nodeId]]);
+                if (this.lastStock[nodeId] === stock) continue;
+                this.popupStockEls[nodeId].textContent = stock;
+                this.lastStock[nodeId] = stock;
+            }
+        },
+
+        initCharts: function() {
             const co2Ctx = document.getElementById('co2Chart').getContext('2d');
-            this.charts.co2Chart = new Chart(co2Ctx, {{
+            this.charts.co2Chart = new Chart(co2Ctx, {
                 type: 'bar',
-                data: {{
+                data: {
                     labels: ['Truck', 'Rail', 'Air'],
-                    datasets: [{{
+                    datasets: [{
                         label: 'CO2 Emissions (kg)',
                         data: [0, 0, 0],
                         backgroundColor: ['blue', 'green', 'red']
-                    }}]
-                }},
-                options: {{
+                    }]
+                },
+                options: {
                     responsive: true,
                     maintainAspectRatio: false,
-                    scales: {{
-                        y: {{ beginAtZero: true }}
-                    }}
-                }}
-            }});
+                    animation: false,
+                    scales: {
+                        y: { beginAtZero: true }
+                    }
+                }
+            });
 
             const scenarioCtx = document.getElementById('scenarioChart').getContext('2d');
-            this.charts.scenarioChart = new Chart(scenarioCtx, {{
+            this.charts.scenarioChart = new Chart(scenarioCtx, {
                 type: 'line',
-                data: {{
+                data: {
                     labels: [],
                     datasets: [
-                        {{
+                        {
                             label: 'Baseline',
                             data: [],
                             borderColor: 'blue',
                             fill: false
-                        }},
-                        {{
+                        },
+                        {
                             label: 'Green Rail',
                             data: [],
                             borderColor: 'green',
                             fill: false
-                        }},
-                        {{
+                        },
+                        {
                             label: 'Local Source',
                             data: [],
                             borderColor: 'orange',
                             fill: false
-                        }}
+                        }
                     ]
-                }},
-                options: {{
+                },
+                options: {
                     responsive: true,
                     maintainAspectRatio: false,
-                    scales: {{
-                        x: {{
-                            title: {{
+                    animation: false,
+                    scales: {
+                        x: {
+                            title: {
                                 display: true,
                                 text: 'Time (Days)'
-                            }}
-                        }},
-                        y: {{
-                            title: {{
+                            }
+                        },
+                        y: {
+                            title: {
                                 display: true,
                                 text: 'Cumulative CO2 (kg)'
-                            }}
-                        }}
-                    }}
-                }}
-            }});
-        }},
-
-        updateCharts: function() {{
-            this.charts.co2Chart.data.datasets[0].data = [
-                this.co2Data[this.currentScenario].truck,
-                this.co2Data[this.currentScenario].rail,
-                this.co2Data[this.currentScenario].air
-            ];
-            this.charts.co2Chart.update();
+                            }
+                        }
+                    }
+                }
+            });
+        },
+
+        updateCharts: function() {
+            // Coalesce chart redraws into at most one per animation frame
+            if (this.chartUpdatePending) return;
+            this.chartUpdatePending = true;
+            requestAnimationFrame(() => {
+                this.chartUpdatePending = false;
+                this.renderCharts();
+            });
+        },
+
+        renderCharts: function() {
+            const co2 = this.co2Arr;
+            const base = this.SCENARIO_IDX[this.currentScenario] * 3;
+            this.charts.co2Chart.data.datasets[0].data = Array.from(co2.subarray(base, base + 3));
+            this.charts.co2Chart.update('none');
 
             const timeLabel = Math.round(this.simulationTime / 86400);
-            if (!this.scenarioComparison.baseline.includes(timeLabel)) {{
-                ['baseline', 'green_rail', 'local_source'].forEach(scenario => {{
-                    this.scenarioComparison[scenario].push(timeLabel);
-                }});
-
-                this.charts.scenarioChart.data.labels.push(timeLabel);
-                this.charts.scenarioChart.data.datasets[0].data.push(
-                    this.co2Data.baseline.truck + this.co2Data.baseline.rail + this.co2Data.baseline.air
-                );
-                this.charts.scenarioChart.data.datasets[1].data.push(
-                    this.co2Data.green_rail.truck + this.co2Data.green_rail.rail + this.co2Data.green_rail.air
-                );
-                this.charts.scenarioChart.data.datasets[2].data.push(
-                    this.co2Data.local_source.truck + this.co2Data.local_source.rail + this.co2Data.local_source.air
-                );
-                this.charts.scenarioChart.update();
-            }}
-        }},
-
-        simulationStep: function() {{
-            try {{
+            if (timeLabel !== this.lastPlottedDay) {
+                this.lastPlottedDay = timeLabel;
+                const chart = this.charts.scenarioChart;
+
+                chart.data.labels.push(timeLabel);
+                // Datasets are in SCENARIO_IDX order
+                for (let i = 0; i < 3; i++) {
+                    chart.data.datasets[i].data.push(this.co2TotalArr[i]);
+                }
+                if (chart.data.labels.length > this.maxChartPoints) {
+                    chart.data.labels.shift();
+                    chart.data.datasets.forEach(dataset => dataset.data.shift());
+                }
+                chart.update('none');
+            }
+        },
+
+        simulationStep: function(timestamp) {
+            try {
                 if (!this.isPlaying) return;
 
                 // Check for valid map reference
-                if (!theMap) {{
+                if (!theMap) {
                     theMap = window[mapId]; // Try to get map again
-                }}
-                if (!theMap) {{
+                }
+                if (!theMap) {
                     console.warn('Map not available during simulation step, skipping update');
                     return;
-                }}
+                }
 
-                const deltaTime = (1/60) * this.simulationSpeed;
-                this.simulationTime += deltaTime;
-                this.currentDate = new Date(this.startDate.getTime() + this.simulationTime * 1000);
+                // Simulation logic runs on a fixed wall-clock step; the display refreshes every frame.
+                // The backlog is capped so a backgrounded tab doesn't replay minutes of ticks at once.
+                if (this.lastFrameTs === null) this.lastFrameTs = timestamp;
+                this.tickAccumulator += Math.min(timestamp - this.lastFrameTs, 1000);
+                this.lastFrameTs = timestamp;
+
+                while (this.tickAccumulator >= this.tickMs) {
+                    this.tickAccumulator -= this.tickMs;
+                    const deltaTime = this.tickMs / 1000 * this.simulationSpeed;
+                    this.simulationTime += deltaTime;
+                    this.updateCalendar();
+
+                    this.processArrivals();
+                    this.updateNodeStates(deltaTime);
+                    this.processShipments();
+                    this.updateMovingMarkers();
+                }
 
-                this.updateNodeStates();
-                this.processShipments();
+                // Vehicles are placed every frame at the simulated time part-way into the next tick,
+                // so they glide instead of stepping at the tick rate
+                this.advanceVehicles(this.simulationTime + this.tickAccumulator / 1000 * this.simulationSpeed);
                 this.updateDisplay();
 
-                if (Math.floor(this.simulationTime) % 60 === 0) {{
+                // Update charts on the simulated minute rollover, at most once per wall-clock second
+                const minuteNow = (this.simulationTime / 60) | 0;
+                if (minuteNow !== this.lastChartMinute && timestamp - this.lastChartUpdate >= 1000) {
+                    this.lastChartMinute = minuteNow;
+                    this.lastChartUpdate = timestamp;
                     this.updateCharts();
-                }}
+                }
 
-                requestAnimationFrame(() => this.simulationStep());
-            }} catch (error) {{
+                requestAnimationFrame((ts) => this.simulationStep(ts));
+            } catch (error) {
                 console.error('CRITICAL: Error in simulation step:', error.message || error);
                 this.isPlaying = false;
-            }}
-        }},
+            }
+        },
 
-        startSimulation: function() {{
-            this.simulationStep();
-        }},
+        startSimulation: function() {
+            this.lastFrameTs = null;
+            this.tickAccumulator = 0;
+            requestAnimationFrame((ts) => this.simulationStep(ts));
+        },
 
-        stopSimulation: function() {{
+        stopSimulation: function() {
             // Animation will stop automatically when isPlaying becomes false
-        }},
-
-        inspectFacility: function(nodeId) {{
-            const node = this.nodesData[nodeId];
-            const state = this.nodeState[nodeId];
-
-            document.getElementById('inspectorContent').innerHTML = `
-                <h4>${{node.name}}</h4>
-                <div class="data-row">
-                    <span>Product:</span>
-                    <span>${{node.product}}</span>
-                </div>
-                <div class="data-row">
-                    <span>Current Stock:</span>
-                    <span>${{Math.round(state.stock)}} units</span>
-                </div>
-                <div class="data-row">
-                    <span>Capacity:</span>
-                    <span>${{state.capacity}} units</span>
-                </div>
-                <div class="data-row">
-                    <span>Stock Level:</span>
-                    <span>${{((state.stock / state.capacity) * 100).toFixed(1)}}%</span>
-                </div>
-                <div class="data-row">
-                    <span>Inbound Rate:</span>
-                    <span>${{Math.round(state.inbound_rate)}} units/hour</span>
-                </div>
-                <div class="data-row">
-                    <span>Outbound Rate:</span>
-                    <span>${{Math.round(state.outbound_rate)}} units/hour</span>
-                </div>
-                <div class="data-row">
-                    <span>Production Rate:</span>
-                    <span>${{Math.round(state.production_rate)}} units/hour</span>
-                </div>
-                <div class="data-row">
-                    <span>Sales Rate:</span>
-                    <span>${{Math.round(state.sales_rate)}} units/hour</span>
-                </div>
-            `;
-
-            document.getElementById('inspectorPanel').classList.remove('collapsed');
-            document.querySelector('#inspectorPanel .panel-toggle').textContent = '−';
-        }}
-    }};
-    """
-
-    # Format the simulation_js with the captured map_id
-    simulation_js = simulation_js.replace('MAP_ID_PLACEHOLDER', map_id)
-
-    # Add moving marker functions to the main simulation script
-    moving_marker_code = """
-        // Moving markers functionality
-        this.movingMarkers = {};
-
-        this.createMovingMarker = function(routeId, vehicleType) {
-            console.log('Creating moving marker for route:', routeId, 'type:', vehicleType);
-            const routeCoords = this.routeCoordinates[routeId];
-            console.log('Route coordinates:', routeCoords);
+        },
 
-            if (!routeCoords || routeCoords.length < 2) {
-                console.log('Invalid route coordinates for', routeId);
-                return null;
+        inspectFacility: function(nodeId) {
+            // The inspector markup is built on first use; after that only the field text changes
+            if (!this.dom.inspectorFields) {
+                this.dom.inspectorContent.innerHTML = `
+                    <h4 id="insp_name"></h4>
+                    <div class="data-row">
+                        <span>Product:</span>
+                        <span id="insp_product"></span>
+                    </div>
+                    <div class="data-row">
+                        <span>Current Stock:</span>
+                        <span><span id="insp_stock"></span> units</span>
+                    </div>
+                    <div class="data-row">
+                        <span>Capacity:</span>
+                        <span><span id="insp_capacity"></span> units</span>
+                    </div>
+                    <div class="data-row">
+                        <span>Stock Level:</span>
+                        <span><span id="insp_level"></span>%</span>
+                    </div>
+                    <div class="data-row">
+                        <span>Inbound Rate:</span>
+                        <span><span id="insp_inbound"></span> units/hour</span>
+                    </div>
+                    <div class="data-row">
+                        <span>Outbound Rate:</span>
+                        <span><span id="insp_outbound"></span> units/hour</span>
+                    </div>
+                    <div class="data-row">
+                        <span>Production Rate:</span>
+                        <span><span id="insp_production"></span> units/hour</span>
+                    </div>
+                    <div class="data-row">
+                        <span>Sales Rate:</span>
+                        <span><span id="insp_sales"></span> units/hour</span>
+                    </div>
+                `;
+                this.dom.inspectorFields = {};
+                ['name', 'product', 'stock', 'capacity', 'level', 'inbound', 'outbound', 'production', 'sales'].forEach(field => {
+                    this.dom.inspectorFields[field] = document.getElementById('insp_' + field);
+                });
             }
 
-            const route = this.routesData[routeId];
-            const speedKmh = route.speed;
-            const distance = this.calculateRouteDistance(routeCoords);
-            const duration = (distance / speedKmh) * 3600000 / this.simulationSpeed;
-
-            console.log('Route distance:', distance, 'km, duration:', duration, 'ms');
+            const node = this.nodesData[nodeId];
+            this.inspectedNodeId = nodeId;
+            this.dom.inspectorFields.name.textContent = node.name;
+            this.dom.inspectorFields.product.textContent = node.product;
+            this.refreshInspector();
 
-            const iconHtml = this.getVehicleIcon(vehicleType);
-            console.log('Vehicle icon HTML:', iconHtml);
+            this.dom.inspectorPanel.classList.remove('collapsed');
+            this.dom.inspectorToggle.textContent = '−';
+        },
 
-            try {
-                const marker = L.Marker.movingMarker(routeCoords, [duration], {
-                    icon: L.divIcon({
-                        html: iconHtml,
-                        className: 'vehicle-icon',
-                        iconSize: [30, 30],
-                        iconAnchor: [15, 15]
-                    }),
-                    autostart: false
-                }).addTo(map);
-
-                console.log('Moving marker created successfully for', routeId);
+        refreshInspector: function() {
+            const i = this.nodeIdToIdx[this.inspectedNodeId];
+            const fields = this.dom.inspectorFields;
+            fields.stock.textContent = Math.round(this.stockArr[i]);
+            fields.capacity.textContent = this.capacityArr[i];
+            fields.level.textContent = ((this.stockArr[i] / this.capacityArr[i]) * 100).toFixed(1);
+            fields.inbound.textContent = Math.round(this.inboundRateArr[i]);
+            fields.outbound.textContent = Math.round(this.outboundRateArr[i]);
+            fields.production.textContent = Math.round(this.productionRateArr[i]);
+            fields.sales.textContent = Math.round(this.salesRateArr[i]);
+        },
 
-                this.movingMarkers[routeId] = {
-                    marker: marker,
-                    routeId: routeId,
-                    vehicleType: vehicleType,
-                    duration: duration,
-                    distance: distance,
-                    isMoving: false,
-                    lastStartTime: 0
-                };
+        addFacilityMarkers: function() {
+            // One GeoJSON layer for all facilities inside a cluster group, so only markers in view
+            // hit the DOM once the network grows; popup HTML is only built when opened
+            const cluster = L.markerClusterGroup({
+                chunkedLoading: true,
+                chunkInterval: 50,
+                disableClusteringAtZoom: 6
+            });
+            cluster.addLayer(L.geoJson({ type: 'FeatureCollection', features: this.facilityFeatures }, {
+                pointToLayer: (feature, latlng) => L.marker(latlng, {
+                    icon: L.AwesomeMarkers.icon({
+                        icon: feature.properties.icon,
+                        iconColor: 'white',
+                        markerColor: feature.properties.icon_color,
+                        prefix: 'fa'
+                    })
+                }).bindPopup(() => this.renderPopup(feature.properties))
+                    .on('click', () => this.inspectFacility(feature.properties.id))
+                    .on('popupopen', () => this.trackPopupStock(feature.properties.id))
+                    .on('popupclose', () => {
+                        delete this.popupStockEls[feature.properties.id];
+                    })
+            }));
+            theMap.addLayer(cluster);
+        },
 
-                return marker;
-            } catch (error) {
-                console.error('Error creating moving marker:', error);
-                return null;
+        trackPopupStock: function(nodeId) {
+            // Look the stock span up once per opening; updateDisplay writes to it directly
+            const element = document.getElementById(`inventory-${nodeId}-stock`);
+            if (element) {
+                this.popupStockEls[nodeId] = element;
+                this.lastStock[nodeId] = Number(element.textContent);
             }
-        };
+        },
 
-        this.getVehicleIcon = function(vehicleType) {
-            const icons = {
-                truck: '<div style="color: blue; font-size: 20px;">🚛</div>',
-                rail: '<div style="color: green; font-size: 20px;">🚂</div>',
-                air: '<div style="color: red; font-size: 20px;">✈️</div>',
-                multimodal: '<div style="color: purple; font-size: 20px;">🚛</div>'
-            };
-            return icons[vehicleType] || icons.truck;
-        };
-
-        this.calculateRouteDistance = function(coords) {
-            let totalDistance = 0;
-            for (let i = 1; i < coords.length; i++) {
-                totalDistance += this.calculateDistance(
-                    coords[i-1][0], coords[i-1][1],
-                    coords[i][0], coords[i][1]
-                );
-            }
-            return totalDistance;
-        };
-
-        this.startVehicleMovement = function(routeId) {
-            console.log('Starting vehicle movement for', routeId);
-            const vehicle = this.movingMarkers[routeId];
-            if (vehicle && !vehicle.isMoving) {
-                vehicle.marker.start();
-                vehicle.isMoving = true;
-                vehicle.lastStartTime = Date.now();
-
-                setTimeout(() => {
-                    this.onVehicleArrival(routeId);
-                }, vehicle.duration);
-            }
-        };
-
-        this.onVehicleArrival = function(routeId) {
-            console.log('Vehicle arrived at destination for', routeId);
-            const vehicle = this.movingMarkers[routeId];
-            if (vehicle) {
-                vehicle.isMoving = false;
-                setTimeout(() => {
-                    if (this.movingMarkers[routeId]) {
-                        this.resetVehiclePosition(routeId);
-                    }
-                }, 3000);
-            }
-        };
-
-        this.resetVehiclePosition = function(routeId) {
-            const vehicle = this.movingMarkers[routeId];
-            if (vehicle) {
-                vehicle.marker.stop();
-                const routeCoords = this.routeCoordinates[routeId];
-                if (routeCoords && routeCoords.length > 0) {
-                    vehicle.marker.setLatLng(routeCoords[0]);
-                }
-                vehicle.isMoving = false;
+        placeVehicle: function(vehicle, i) {
+            // Move a vehicle to the point starting at index i of the flat coordinate column
+            vehicle.latLng.lat = this.routeCoordsFlat[i];
+            vehicle.latLng.lng = this.routeCoordsFlat[i + 1];
+            vehicle.marker.setLatLng(vehicle.latLng);
+        },
+
+        routeLatLngs: function(routeId) {
+            // Nested [[lat, lng], ...] path for Leaflet layers that need one
+            const offsets = this.routeOffsets[routeId];
+            const latLngs = [];
+            for (let i = offsets[0]; i < offsets[1]; i += 2) {
+                latLngs.push([this.routeCoordsFlat[i], this.routeCoordsFlat[i + 1]]);
             }
-        };
+            return latLngs;
+        },
 
-        this.initializeMovingMarkers = function() {
-            console.log('Initializing moving markers...');
-            Object.keys(this.routesData).forEach(routeId => {
-                const route = this.routesData[routeId];
-                this.createMovingMarker(routeId, route.vehicle);
+        addRoutePaths: function() {
+            const routeColors = { truck: 'blue', rail: 'green', air: 'red', multimodal: 'purple' };
+
+            // Draw every route in one loop instead of one Folium AntPath object per route
+            Object.keys(this.routeOffsets).forEach(routeId => {
+                const coords = this.routeLatLngs(routeId);
+                const mode = this.routesData[routeId].mode || 'truck';
+                L.polyline.antPath(coords, {
+                    color: routeColors[mode] || 'blue',
+                    weight: 4,
+                    opacity: 0.7,
+                    dashArray: mode === 'rail' ? [15, 30] : [10, 20],
+                    pulseColor: '#ffffff',
+                    delay: 1000
+                }).addTo(theMap);
             });
+        },
 
-            // Force start a test vehicle immediately
-            setTimeout(() => {
-                console.log('Starting test vehicle...');
-                this.startVehicleMovement('china_poland'); // Start China->Poland train
-            }, 2000);
-        };
-
-        this.updateMovingMarkers = function() {
-            try {
-                // Check for valid map reference before updating markers
-                if (!theMap) {
-                    console.error('CRITICAL: Map not available for moving markers update');
-                    return;
-                }
-
-                Object.keys(this.routesData).forEach(routeId => {
-                    const route = this.routesData[routeId];
-                    const vehicle = this.movingMarkers[routeId];
-
-                    if (vehicle && !vehicle.isMoving) {
-                        const startChance = (1 / route.frequency) * (this.simulationTime / 3600);
-                        if (Math.random() < startChance * 0.5) {
-                            this.startVehicleMovement(routeId);
-                        }
-                    }
-                });
-            } catch (error) {
-                console.error('CRITICAL: Error updating moving markers:', error.message || error);
-            }
-        };
+        renderPopup: function(facility) {
+            const state = this.getNodeState(facility.id);
+            const stock = Math.round(state.stock);
+            this.lastStock[facility.id] = stock;
+            return `
+                <div style="width: 200px;">
+                    <h4>${facility.name}</h4>
+                    <p><strong>Product:</strong> ${facility.product}</p>
+                    <p><strong>Type:</strong> ${facility.type}</p>
+                    <p><strong>Capacity:</strong> ${facility.capacity} units</p>
+                    <div id="inventory-${facility.id}"><strong>Stock:</strong> <span id="inventory-${facility.id}-stock">${stock}</span>/${state.capacity} units</div>
+                </div>
+            `;
+        }
+    };
     """
 
-    # Insert the moving marker code into the init function
-    init_content = f"""
-            {moving_marker_code}
-            """
-
-    simulation_js = simulation_js.replace(
-        "        init: function() {\n            this.setupEventListeners();\n            this.initCharts();\n            this.updateDisplay();\n            console.log('IKEA Simulation initialized');\n        },",
-        f"        init: function() {{\n            {init_content}\n            this.setupEventListeners();\n            this.initCharts();\n            this.updateDisplay();\n            console.log('IKEA Simulation initialized');\n        }},"
-    )
-
-    # Fix double braces for JavaScript syntax
-    simulation_js = simulation_js.replace('{{', '{')
-    simulation_js = simulation_js.replace('}}', '}')
-
-    # Use minimal data for now to get basic structure working
-    simulation_js = simulation_js.replace(
-        "{json.dumps({node_id: {\n            'stock': node_data['initial_stock'],\n            'capacity': node_data['capacity'],\n            'inbound_rate': 0,\n            'outbound_rate': 0,\n            'production_rate': 50 if node_data['type'] == 'manufacturing' else 0,\n            'sales_rate': 20 if node_data['type'] == 'retail' else 0\n        } for node_id, node_data in nodes.items()})}",
-        "{}"
-    )
-
-    simulation_js = simulation_js.replace(
-        "{json.dumps(routes)}",
-        "{}"
-    )
-
-    simulation_js = simulation_js.replace(
-        "{json.dumps(nodes)}",
-        "{}"
-    )
-
-    simulation_js = simulation_js.replace(
-        "{json.dumps(route_coordinates)}",
-        "{}"
-    )
-
-    # Write JavaScript to a separate file and include it
-    with open('ikea_simulation.js', 'w') as f:
-        f.write(simulation_js)
-
     # Add custom CSS
-    custom_css = """
-    <style>
+    custom_css = minify_css("""
     .control-panel {
         position: absolute;
         top: 10px;
@@ -1993,11 +1676,7 @@ def create_ikea_simulation():
         text-shadow: 1px 1px 2px rgba(0,0,0,0.5);
         line-height: 1;
     }
-    </style>
-    """
-
-    # 1. Inject CSS (Header)
-    m.get_root().header.add_child(folium.Element(custom_css))
+    """)
 
     # Add HTML elements for UI panels
     ui_html = """
@@ -2089,46 +1768,8 @@ def create_ikea_simulation():
     </div>
     """
 
-    # 2. Inject UI HTML (Body) - MUST BE BEFORE JS
-    m.get_root().html.add_child(folium.Element(ui_html))
-
-    # Insert the moving marker code into the init function
-    init_content = f"""
-            {moving_marker_code}
-            """
-
-    simulation_js = simulation_js.replace(
-        "        init: function() {\\n            this.setupEventListeners();\\n            this.initCharts();\\n            this.updateDisplay();\\n            console.log('IKEA Simulation initialized');\\n        },",
-        f"        init: function() {{\\n            {init_content}\\n            this.setupEventListeners();\\n            this.initCharts();\\n            this.updateDisplay();\\n            console.log('IKEA Simulation initialized');\\n        }},"
-    )
-
-    # Fix double braces for JavaScript syntax
-    simulation_js = simulation_js.replace('{{', '{')
-    simulation_js = simulation_js.replace('}}', '}')
-
-    # Use minimal data for now to get basic structure working
-    simulation_js = simulation_js.replace(
-        "{json.dumps({node_id: {\\n            'stock': node_data['initial_stock'],\\n            'capacity': node_data['capacity'],\\n            'inbound_rate': 0,\\n            'outbound_rate': 0,\\n            'production_rate': 50 if node_data['type'] == 'manufacturing' else 0,\\n            'sales_rate': 20 if node_data['type'] == 'retail' else 0\\n        } for node_id, node_data in nodes.items()})}",
-        "{}"
-    )
-
-    simulation_js = simulation_js.replace(
-        "{json.dumps(routes)}",
-        "{}"
-    )
-
-    simulation_js = simulation_js.replace(
-        "{json.dumps(nodes)}",
-        "{}"
-    )
-
-    simulation_js = simulation_js.replace(
-        "{json.dumps(route_coordinates)}",
-        "{}"
-    )
-    
-    # Add safeguard to initialization
-    simulation_js += """
+    # Safeguard initialization
+    init_js = """
     // Safeguard initialization
     window.addEventListener('load', function() {
         console.log('Window loaded, initializing...');
@@ -2142,52 +1783,149 @@ def create_ikea_simulation():
     });
     """
 
-    # Write JavaScript to a separate file and include it
-    with open('ikea_simulation.js', 'w') as f:
-        f.write(simulation_js)
-
-    # 3. Inject JS Libraries and Simulation Script (Body) - LAST
-    # Note: Leaflet and other libs are already added by Folium or in the template
-    # We just need to add our custom script
-    js_include = '<script src="ikea_simulation.js"></script>'
-    m.get_root().html.add_child(folium.Element(js_include))
+    # Fill in the map id and simulation data in a single pass over the bundle
+    js_data = {
+        'MAP_ID': map_id,
+        'NODE_STATE': to_json(node_state),
+        'ROUTES_DATA': to_json(routes),
+        'NODES_DATA': to_json(nodes),
+        'ROUTE_COORDS_FLAT': to_json(flat_coords),
+        'ROUTE_OFFSETS': to_json(route_offsets),
+        'FACILITY_FEATURES': to_json(facility_features),
+        'SCENARIO_APPLIERS': scenario_appliers_js(list(node_state)),
+        'SEASON': to_json([1.0] + SEASONALITY),
+    }
+    simulation_js = re.sub(r'\b([A-Z_]+)_PLACEHOLDER\b', lambda m: js_data[m.group(1)], simulation_js)
+
+    # Write JavaScript to a separate file, leaving it untouched if nothing changed
+    write_if_changed('ikea_simulation.js', ''.join([simulation_js, init_js]))
+
+    # Render CSS, UI panels, map setup and script includes into the page in one pass
+    page = TEMPLATE_ENV.get_template('sim.html.j2').render(
+        map_id=map_id,
+        map_center=map_center,
+        map_zoom=map_zoom,
+        custom_css=custom_css,
+        ui_html=ui_html,
+        script_includes=script_includes,
+        simulation_script='ikea_simulation.js',
+    )
 
-    # Save the map
+    # Save the page
     output_file = 'ikea_master_simulation.html'
-    m.save(output_file)
+    write_if_changed(output_file, page)
     print(f"IKEA Supply Chain Simulation saved as '{output_file}'")
     
     # Serve the file
     serve_simulation(output_file)
 
+class GzipHandler(http.server.SimpleHTTPRequestHandler):
+    """Static file handler that gzips the generated HTML and JavaScript"""
+
+    compressible_types = ('.html', '.js')
+    # Compressed bodies keyed by path, reused until the file's mtime changes
+    gzip_cache = {}
+
+    def send_response(self, code, message=None):
+        self.response_code = code
+        super().send_response(code, message)
+
+    def end_headers(self):
+        # Only successful file responses are cacheable; errors and directory listings are not.
+        # The generated page and bundle are revalidated so a rerun shows up on reload;
+        # other files may be reused for an hour
+        if self.response_code in (200, 304) and os.path.isfile(self.translate_path(self.path)):
+            if self.path.split('?')[0].endswith(self.compressible_types):
+                self.send_header('Cache-Control', 'no-cache')
+            else:
+                self.send_header('Cache-Control', 'public, max-age=3600')
+        super().end_headers()
+
+    def accepts_gzip(self):
+        """Whether Accept-Encoding allows gzip, honouring q-values (q=0 means refused)"""
+        qvalues = {}
+        for coding in self.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = coding.partition(';')
+            q = 1.0
+            for param in params.split(';'):
+                key, _, value = param.partition('=')
+                if key.strip().lower() == 'q':
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            qvalues[name.strip().lower()] = q
+        # An explicit gzip entry wins over the * wildcard
+        return qvalues.get('gzip', qvalues.get('*', 0.0)) > 0
+
+    def send_gzip_head(self):
+        """Send headers for a gzipped asset and return its body, or None if it doesn't apply"""
+        path = self.translate_path(self.path)
+        if not (path.endswith(self.compressible_types) and os.path.isfile(path) and self.accepts_gzip()):
+            return None
+
+        mtime = os.path.getmtime(path)
+        cached = self.gzip_cache.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path, 'rb') as f:
+                body = gzip.compress(f.read(), compresslevel=6)
+            cached = self.gzip_cache[path] = (mtime, body, '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest())
+        _, body, etag = cached
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return b''
+
+        self.send_response(200)
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        return body
+
+    def do_GET(self):
+        body = self.send_gzip_head()
+        if body is None:
+            super().do_GET()
+        else:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        if self.send_gzip_head() is None:
+            super().do_HEAD()
+
 def serve_simulation(output_file):
     """Serve the simulation file via a local HTTP server"""
-    PORT = 8000
-    Handler = http.server.SimpleHTTPRequestHandler
-    
-    # Find a free port
-    while True:
-        try:
-            with socketserver.TCPServer(("", PORT), Handler) as httpd:
-                print(f"Serving at http://localhost:{PORT}")
-                
-                # Open browser in a separate thread to ensure server is ready
-                def open_browser():
-                    time.sleep(1.5) # Give server a moment to start
-                    url = f"http://localhost:{PORT}/{output_file}"
-                    print(f"Opening {url}...")
-                    webbrowser.open(url)
-                
-                threading.Thread(target=open_browser).start()
-                
-                print("Press Ctrl+C to stop the server")
+    # Port 0 lets the kernel hand out a free port in a single bind;
+    # one thread per request so the page and its assets load concurrently
+    with http.server.ThreadingHTTPServer(("", 0), GzipHandler) as httpd:
+        httpd.daemon_threads = True
+        port = httpd.server_address[1]
+        print(f"Serving at http://localhost:{port}")
+
+        # Open browser in a separate thread as soon as the server accepts connections
+        def open_browser():
+            for _ in range(50):
                 try:
-                    httpd.serve_forever()
-                except KeyboardInterrupt:
-                    print("\\nServer stopped.")
+                    socket.create_connection(('localhost', port), timeout=0.05).close()
                     break
-        except OSError:
-            PORT += 1
+                except OSError:
+                    time.sleep(0.02)
+            url = f"http://localhost:{port}/{output_file}"
+            print(f"Opening {url}...")
+            webbrowser.open(url)
+
+        threading.Thread(target=open_browser).start()
+
+        print("Press Ctrl+C to stop the server")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\nServer stopped.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,83 @@
+"""
+Supply Chain Graph - least-cost path queries over the IKEA route network
+Routes are directed edges between nodes, weighted by CO2 or travel time
+"""
+
+import heapq
+
+def route_cost(route_data, weight='co2'):
+    """Cost of one route leg: 'co2' (distance_km x emission factor) or 'time' (hours)"""
+    # distance_km is measured by create_ikea_simulation; there is no sensible default
+    distance = route_data['distance_km']
+    if weight == 'time':
+        return distance / route_data['speed']
+    return distance * route_data['emission']
+
+def path_cost(routes, path, weight='co2'):
+    """Total cost of a sequence of route ids"""
+    return sum(route_cost(routes[route_id], weight) for route_id in path)
+
+def build_graph(routes, weight='co2'):
+    """Build an adjacency list {from_node: [(cost, to_node, route_id), ...]}"""
+    graph = {}
+    for route_id, route_data in routes.items():
+        graph.setdefault(route_data['from'], []).append(
+            (route_cost(route_data, weight), route_data['to'], route_id)
+        )
+    return graph
+
+def best_path(routes, src, dst, weight='co2', graph=None):
+    """Return the route ids on the least-cost path from src to dst, or None if unreachable"""
+    # Pass a graph from build_graph to reuse it across several queries
+    if graph is None:
+        graph = build_graph(routes, weight)
+    best = {src: 0}
+    previous = {}
+    heap = [(0, src)]
+    while heap:
+        cost, node = heapq.heappop(heap)
+        if node == dst:
+            break
+        if cost > best[node]:
+            continue
+        for edge_cost, next_node, route_id in graph.get(node, []):
+            new_cost = cost + edge_cost
+            if new_cost < best.get(next_node, float('inf')):
+                best[next_node] = new_cost
+                previous[next_node] = (node, route_id)
+                heapq.heappush(heap, (new_cost, next_node))
+
+    if dst not in best:
+        return None
+
+    # Walk back from the destination to recover the route sequence
+    path = []
+    node = dst
+    while node != src:
+        node, route_id = previous[node]
+        path.append(route_id)
+    return path[::-1]
+
+def lowest_cost_supply_paths(routes, nodes, weight='co2'):
+    """Cheapest path from any raw-material node into each retail node, as (node_id, path, cost)"""
+    graph = build_graph(routes, weight)
+    sources = [node_id for node_id, node_data in nodes.items() if node_data['type'] == 'raw_materials']
+    results = []
+    for node_id, node_data in nodes.items():
+        if node_data['type'] != 'retail':
+            continue
+        paths = [path for path in (best_path(routes, src, node_id, weight, graph) for src in sources) if path]
+        if paths:
+            path = min(paths, key=lambda path: path_cost(routes, path, weight))
+            results.append((node_id, path, path_cost(routes, path, weight)))
+    return results
+
+if __name__ == "__main__":
+    # Report the lowest-CO2 supply paths over the measured IKEA routes
+    from ikea_supply_chain_simulation import NODES, ROUTES, measure_routes
+
+    routes = {route_id: dict(route_data) for route_id, route_data in ROUTES.items()}
+    measure_routes(routes, NODES)
+    for node_id, path, cost in lowest_cost_supply_paths(routes, NODES):
+        print(f"Lowest-CO2 supply path to {node_id}: {' -> '.join(path)} "
+              f"(cost {cost:.1f}, km x emission factor)")